@@ -3,66 +3,104 @@ Markdown Documentation Viewer
 A Flask-based web application that presents Markdown files from a folder as well-formatted HTML sections.
 """
 
-from flask import Flask, render_template, send_from_directory, request, jsonify, redirect, url_for, abort, Response, session
+from flask import Flask, render_template, send_file, request, jsonify, redirect, url_for, abort, Response, session, make_response
+from flask.sessions import SecureCookieSessionInterface
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import is_resource_modified
 import os
+import posixpath
 import sys
-import markdown
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
 import io
 import re
 import html as html_module
 import json
+import gzip
+import hashlib
 import shutil
-import logging
-from logging.handlers import RotatingFileHandler
-import zipfile
-import urllib.request
-import subprocess
 import tempfile
-from bs4 import BeautifulSoup
-
-# Try to import PDF libraries
-PDF_EXPORT_AVAILABLE = False
-PDF_LIB_NAME = None
+import zipfile
+import logging
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+import queue
+import atexit
+import threading
+from collections import OrderedDict, deque
+import importlib
+import importlib.util
+import types
+import copy
+import itertools
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Heavy optional libraries (pdfkit, htmldocx, mammoth, bs4, tkinter) are imported on first
+# use by the routes that need them, keeping them off the startup path.
+@lru_cache(maxsize=None)
+def optional_import(module_name: str, feature: str):
+    """Import an optional dependency once; returns None (logging why) if unavailable."""
+    try:
+        return importlib.import_module(module_name)
+    except Exception as e:
+        logger.warning(f"{module_name} not available: {e}")
+        logger.warning(f"{feature} feature will be disabled.")
+        return None
 
+@lru_cache(maxsize=None)
+def docx_api():
+    """python-docx names used by Word export, imported once; None if python-docx is missing."""
+    if optional_import('docx', 'Word export') is None:
+        return None
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    from docx.shared import RGBColor, Pt
+    return types.SimpleNamespace(Document=Document, WD_ALIGN_PARAGRAPH=WD_ALIGN_PARAGRAPH,
+                                 OxmlElement=OxmlElement, qn=qn, RGBColor=RGBColor, Pt=Pt,
+                                 # Qualified attribute names set inside the export loops
+                                 W_ID=qn('w:id'), W_NAME=qn('w:name'), W_ANCHOR=qn('w:anchor'),
+                                 W_FILL=qn('w:fill'), R_ID=qn('r:id'),
+                                 # Prototypes copied by add_bookmark (cheaper than building each)
+                                 bookmark_start=OxmlElement('w:bookmarkStart'),
+                                 bookmark_end=OxmlElement('w:bookmarkEnd'))
+
+@lru_cache(maxsize=None)
+def html_parser_name() -> str:
+    """BeautifulSoup tree builder to use: the C-backed lxml parser when installed, else html.parser."""
+    return 'lxml' if importlib.util.find_spec('lxml') is not None else 'html.parser'
+
+# Optional Brotli support for response compression (gzip is always available)
 try:
-    import pdfkit
-    PDF_EXPORT_AVAILABLE = True
-    PDF_LIB_NAME = "pdfkit"
-except Exception as e:
-    print(f"Warning: pdfkit not available: {e}")
-    print("PDF export feature will be disabled.")
-    pdfkit = None
-
-# Try to import Word export libraries
-WORD_EXPORT_AVAILABLE = False
-WORD_LIB_NAME = None
+    import brotli
+except ImportError:
+    brotli = None
 
+# Optional orjson fast path for config.json and JSON responses (stdlib json otherwise)
 try:
-    from htmldocx import HtmlToDocx
-    WORD_EXPORT_AVAILABLE = True
-    WORD_LIB_NAME = "htmldocx"
-except Exception as e:
-    print(f"Warning: htmldocx not available: {e}")
-    print("Word export feature will be disabled.")
-    HtmlToDocx = None
-
-# Try to import Word input libraries
-WORD_INPUT_AVAILABLE = False
-try:
-    import mammoth
-    WORD_INPUT_AVAILABLE = True
-except Exception as e:
-    print(f"Warning: mammoth not available: {e}")
-    print("Word input feature will be disabled.")
-    mammoth = None
+    import orjson
+
+    def _json_loads(data: bytes):
+        return orjson.loads(data)
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    orjson = None
+
+    def _json_loads(data: bytes):
+        return json.loads(data)
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode('utf-8')
 
 try:
     from docnexus.core.renderer import render_baseline, run_pipeline
     from docnexus.features.registry import FeatureManager, Feature, FeatureState
     from docnexus.features import smart_convert as smart
     from docnexus.features.standard import normalize_headings, sanitize_attr_tokens, build_toc, annotate_blocks
+    from docnexus.search_index import TrigramIndex, ASCII_LOWER, fold_case
 except Exception:
     # allow running as a script: add project root to sys.path, then absolute imports
     PROJECT_ROOT_FOR_PATH = Path(__file__).resolve().parent.parent
@@ -72,8 +110,7 @@ except Exception:
     from docnexus.features.registry import FeatureManager, Feature, FeatureState
     from docnexus.features import smart_convert as smart
     from docnexus.features.standard import normalize_headings, sanitize_attr_tokens, build_toc, annotate_blocks
-
-import os
+    from docnexus.search_index import TrigramIndex, ASCII_LOWER, fold_case
 
 # Standard Version Loading (Fail Fast)
 # In production/rendering, we rely on this import succeeding.
@@ -83,7 +120,6 @@ from docnexus.version_info import __version__ as VERSION
 app = Flask(__name__, static_folder='static')
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
-app.secret_key = os.urandom(24)
 
 # Global Template Context
 @app.context_processor
@@ -120,33 +156,135 @@ else:
 
 app = Flask(__name__, **flask_kwargs)
 
+# Behind a front-end server that understands X-Sendfile (Apache mod_xsendfile,
+# lighttpd), let it stream files instead of the Python worker. Off by default:
+# without such a server the header is ignored and clients get an empty body.
+app.config['USE_X_SENDFILE'] = os.environ.get('DOCNEXUS_USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+
+if orjson is not None:
+    class OrjsonProvider(DefaultJSONProvider):
+        """
+        Serializes JSON responses (jsonify() and returned dicts/lists) with orjson,
+        straight to UTF-8 bytes. Keys stay sorted and Flask's default() still
+        converts dates and other extra types; debug-mode pretty printing and
+        values orjson can't encode (e.g. integers over 64 bits) use the default
+        provider.
+        """
+        def response(self, *args, **kwargs):
+            if self.compact is False or (self.compact is None and self._app.debug):
+                return super().response(*args, **kwargs)
+            obj = self._prepare_response_obj(args, kwargs)
+            try:
+                body = orjson.dumps(obj, default=self.default, option=(
+                    orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_APPEND_NEWLINE))
+            except TypeError:
+                return super().response(*args, **kwargs)
+            return self._app.response_class(body, mimetype=self.mimetype)
+
+    app.json = OrjsonProvider(app)
+
+# Static asset URLs carry the file's mtime (?v=...), so a versioned URL always names
+# the same content and browsers may keep it for a day. Unversioned requests are
+# still revalidated every time (ETag / 304).
+STATIC_MAX_AGE = 86400
+
+@app.url_defaults
+def version_static_urls(endpoint, values):
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        try:
+            values['v'] = int(os.stat(os.path.join(app.static_folder, values['filename'])).st_mtime)
+        except OSError:
+            pass
+
+@app.after_request
+def cache_versioned_static(response):
+    if request.endpoint == 'static' and 'v' in request.args and response.status_code in (200, 304):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+    return response
+
 # Logging Configuration
 LOG_DIR = PROJECT_ROOT / 'logs'
 LOG_DIR.mkdir(exist_ok=True)
 LOG_FILE = LOG_DIR / 'docnexus.log'
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
+# Request threads only enqueue log records; a background QueueListener does the
+# file/console I/O (including rotation) off the request path.
+_root_logger = logging.getLogger()
+if not _root_logger.handlers:
+    _log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    _log_handlers = [
         RotatingFileHandler(LOG_FILE, maxBytes=10*1024*1024, backupCount=7),
         logging.StreamHandler()
     ]
-)
+    for _handler in _log_handlers:
+        _handler.setFormatter(_log_formatter)
+    _log_queue = queue.Queue(-1)
+    _root_logger.setLevel(logging.INFO)
+    _root_logger.addHandler(QueueHandler(_log_queue))
+    LOG_LISTENER = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+    LOG_LISTENER.start()
+    atexit.register(LOG_LISTENER.stop)
 logger = logging.getLogger('docnexus')
 logger.info(f"Application starting - Version {VERSION}")
 
+# Session Configuration
+SECRET_KEY_FILE = PROJECT_ROOT / '.secret_key'
+
+def load_secret_key(key_file: Path) -> bytes:
+    """Load the persistent session secret, creating it (owner-only) on first run."""
+    try:
+        key = key_file.read_bytes()
+        if len(key) >= 32:
+            return key
+    except OSError:
+        pass
+    key = os.urandom(32)
+    try:
+        fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+    except OSError as e:
+        logger.warning(f"Could not persist session secret: {e}")
+    return key
+
+class ReadOnlySessionInterface(SecureCookieSessionInterface):
+    """
+    Cookie sessions that are only decoded for state-changing requests.
+    GET/HEAD routes never read the session, so they get an empty one and skip
+    the signature check; an unmodified empty session leaves the cookie alone.
+    """
+    def open_session(self, app, request):
+        if request.method in ('GET', 'HEAD'):
+            return self.session_class()
+        return super().open_session(app, request)
+
+app.secret_key = load_secret_key(SECRET_KEY_FILE)
+app.session_interface = ReadOnlySessionInterface()
+
 # Workspace Configuration
 CONFIG_FILE = PROJECT_ROOT / 'config.json'
 
+# Parsed config.json and the (st_mtime_ns, st_size) it was read at; the file is only
+# re-read when it changes (it can also be edited by hand while the app runs)
+_CONFIG_CACHE = (None, None)
+_CONFIG_LOCK = threading.Lock()
+
 def load_config():
-    """Load workspace configuration."""
-    if CONFIG_FILE.exists():
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Failed to load config: {e}")
+    """Load workspace configuration. Returns a copy the caller is free to modify."""
+    global _CONFIG_CACHE
+    try:
+        with _CONFIG_LOCK:
+            stat = CONFIG_FILE.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if _CONFIG_CACHE[0] != signature:
+                _CONFIG_CACHE = (signature, _json_loads(CONFIG_FILE.read_bytes()))
+            return copy.deepcopy(_CONFIG_CACHE[1])
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.error(f"Failed to load config: {e}")
     # Determine default workspace
     default_workspace = PROJECT_ROOT / 'workspace'
     if not default_workspace.exists() and (PROJECT_ROOT / 'examples').exists():
@@ -159,10 +297,15 @@ def load_config():
     }
 
 def save_config(config):
-    """Save workspace configuration."""
+    """Save workspace configuration (written to a temporary file, then renamed over config.json)."""
+    global _CONFIG_CACHE
     try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=2)
+        with _CONFIG_LOCK:
+            tmp_file = CONFIG_FILE.with_suffix('.json.tmp')
+            tmp_file.write_bytes(_json_dumps(config))
+            os.replace(tmp_file, CONFIG_FILE)
+            stat = CONFIG_FILE.stat()
+            _CONFIG_CACHE = ((stat.st_mtime_ns, stat.st_size), copy.deepcopy(config))
         logger.info("Configuration saved successfully")
     except Exception as e:
         logger.error(f"Failed to save config: {e}")
@@ -171,7 +314,7 @@ def save_config(config):
 CONFIG = load_config()
 MD_FOLDER = Path(CONFIG['active_workspace'])  # Folder containing documents
 DOCS_FOLDER = PROJECT_ROOT / 'docs'  # Documentation folder
-ALLOWED_EXTENSIONS = {'.md', '.markdown', '.txt', '.docx'}
+ALLOWED_EXTENSIONS = frozenset({'.md', '.markdown', '.txt', '.docx'})
 
 # File size limits (in bytes)
 MAX_FILE_SIZE = 20 * 1024 * 1024  # 20 MB for actual file content
@@ -215,7 +358,6 @@ def load_plugins():
         for item in plugin_path.iterdir():
             if item.is_dir() and (item / 'plugin.py').exists():
                 try:
-                    import importlib.util
                     spec = importlib.util.spec_from_file_location(
                         f"docnexus.plugins_dev.{item.name}", 
                         item / 'plugin.py'
@@ -234,6 +376,12 @@ def load_plugins():
 # Load plugins
 load_plugins()
 
+# Feature pipelines are fixed once plugins have registered: build each variant once
+PIPELINES = {
+    enable_experimental: tuple(FEATURES.build_pipeline(enable_experimental=enable_experimental))
+    for enable_experimental in (False, True)
+}
+
 # Context Processor for Debugging (moved here after all config is loaded)
 @app.context_processor
 def inject_debug_info():
@@ -257,6 +405,43 @@ def inject_debug_info():
         logger.error(f"Error in context processor: {e}")
         return {'debug_info': {'error': str(e)}}
 
+# Response compression for text responses (rendered HTML, JSON, CSS, JS)
+COMPRESS_MIMETYPES = frozenset({'text/html', 'application/json', 'text/css', 'application/javascript', 'text/javascript'})
+COMPRESS_LEVEL = 5
+COMPRESS_MIN_SIZE = 1024
+
+@app.after_request
+def compress_response(response):
+    """Gzip (or Brotli, when installed and accepted) compressible responses."""
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    accepted = request.accept_encodings
+    if brotli and accepted['br']:
+        encoding = 'br'
+    elif accepted['gzip']:
+        encoding = 'gzip'
+    else:
+        return response
+    
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=4))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes are a different representation: keep validators weak
+    etag, is_weak = response.get_etag()
+    if etag and not is_weak:
+        response.set_etag(etag, weak=True)
+    return response
+
 # SIP Protocol Knowledge Base
 SIP_KNOWLEDGE = {
     'request_methods': [
@@ -295,11 +480,221 @@ SIP_KNOWLEDGE = {
     'sdp_attributes': ['RTP', 'SRTP', 'RTCP', 'codec', 'sendrecv', 'recvonly', 'sendonly']
 }
 
+def _keyword_pattern(keywords):
+    """Compile keywords into a single pattern that reports every (overlapping) occurrence."""
+    alternation = '|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+    return re.compile(f'(?=({alternation}))')
+
+def _matched_keywords(pattern, text):
+    """Return the set of keywords from a _keyword_pattern found anywhere in text."""
+    return {m.group(1) for m in pattern.finditer(text)}
+
+def _has_distinct_keywords(pattern, text, threshold, seen=None, key=None):
+    """True once `threshold` distinct keywords (mapped through key) are found; stops scanning early."""
+    seen = set() if seen is None else seen
+    for m in pattern.finditer(text):
+        seen.add(key(m.group(1)) if key else m.group(1))
+        if len(seen) >= threshold:
+            return True
+    return False
+
+def _contains_at_least(needles, text, threshold):
+    """True once `threshold` of the needles occur in text; stops at the threshold."""
+    found = 0
+    for needle in needles:
+        if needle in text:
+            found += 1
+            if found >= threshold:
+                return True
+    return False
+
+def _first_keyword(keywords, rank):
+    """Pick the keyword listed first in the knowledge base, or None."""
+    return min(keywords, key=rank.__getitem__, default=None)
+
+# One-pass multi-keyword matchers over the SIP knowledge base. Each scan replaces
+# a per-keyword substring loop; ranks preserve the knowledge-base priority order.
+SIP_METHOD_RE = _keyword_pattern(SIP_KNOWLEDGE['request_methods'])
+SIP_METHOD_RANK = {m: i for i, m in enumerate(SIP_KNOWLEDGE['request_methods'])}
+SIP_CODE_RE = _keyword_pattern(SIP_KNOWLEDGE['response_codes'])
+SIP_CODE_RANK = {code: i for i, code in enumerate(SIP_KNOWLEDGE['response_codes'])}
+# Status-line lookup built once: '180' -> '180 Ringing' (and the reverse)
+SIP_RESPONSE_LOOKUP = {code: f'{code} {desc}' for code, desc in SIP_KNOWLEDGE['response_codes'].items()}
+SIP_STATUS_LINE_TO_CODE = {status: code for code, status in SIP_RESPONSE_LOOKUP.items()}
+SIP_STATUS_LINE_RE = _keyword_pattern(SIP_RESPONSE_LOOKUP.values())
+SIP_REASON_RE = _keyword_pattern(desc.upper() for desc in SIP_KNOWLEDGE['response_codes'].values())
+SIP_REASON_TO_CODE = {desc.upper(): code for code, desc in SIP_KNOWLEDGE['response_codes'].items()}
+SDP_ATTRIBUTE_RE = _keyword_pattern(SIP_KNOWLEDGE['sdp_attributes'])
+SDP_ATTRIBUTE_RANK = {a: i for i, a in enumerate(SIP_KNOWLEDGE['sdp_attributes'])}
+
+def _response_code_in_line(line, prefix_len):
+    """First known response code whose status line appears in line, or whose code is in its prefix."""
+    codes = {SIP_STATUS_LINE_TO_CODE[status] for status in _matched_keywords(SIP_STATUS_LINE_RE, line)}
+    codes |= _matched_keywords(SIP_CODE_RE, line[:prefix_len])
+    return _first_keyword(codes, SIP_CODE_RANK)
+
+@lru_cache(maxsize=1024)
+def _format_mtime(mtime_seconds: int) -> str:
+    """Format a modification time for listings (many files share the same second)."""
+    return datetime.fromtimestamp(mtime_seconds).strftime('%Y-%m-%d %H:%M:%S')
+
+def _format_size(size_bytes: int) -> str:
+    """Human-readable file size for listings."""
+    if size_bytes < 1024:
+        return f"{size_bytes} B"
+    elif size_bytes < 1024 * 1024:
+        return f"{size_bytes / 1024:.1f} KB"
+    return f"{size_bytes / (1024 * 1024):.1f} MB"
+
+# Per-directory scan cache: dir path -> (st_mtime_ns, files, subdirs).
+# A directory's mtime changes whenever entries are added, removed or renamed
+# (which includes editors' save-via-rename), so unchanged directories are not
+# re-listed. In-place writes don't change it, so cached files are stat()ed again.
+_DIR_SCAN_CACHE = {}
+# Bumped whenever a directory is re-listed, so indexes derived from the scans
+# know when to rebuild.
+_DIR_SCAN_GENERATION = 0
+# (root, generation, {stem / filename / relative path: path}) for find_document()
+_FILE_INDEX = (None, -1, {})
+# Built listings: key -> (signature, items). Recursive listings are signed with the
+# scan generation, folder listings with the mtimes of the folder and its subfolders,
+# and the documentation list with the docs folder mtime.
+_LISTING_CACHE = {}
+# Guards the caches and counters above. Scans and listings are built outside it;
+# their results are only stored if no invalidation happened in the meantime
+# (_LISTING_EPOCH unchanged), so a scan that raced one can't put stale data back.
+_LISTING_LOCK = threading.Lock()
+_LISTING_EPOCH = 0
+
+def invalidate_listing_cache():
+    """Drop cached directory scans (after the app writes files or switches workspace)."""
+    global _DIR_SCAN_GENERATION, _LISTING_EPOCH
+    with _LISTING_LOCK:
+        _DIR_SCAN_CACHE.clear()
+        _LISTING_CACHE.clear()
+        _DIR_SCAN_GENERATION += 1
+        _LISTING_EPOCH += 1
+
+def _file_signature(stat):
+    """What identifies a version of a file: (st_mtime_ns, st_size)."""
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _scan_directory(path: str):
+    """
+    Return ([(path, name, stat_result)], [subdir paths]) for one directory. The
+    listing is cached by the directory's mtime; file stats are refreshed on each call.
+    """
+    global _DIR_SCAN_GENERATION
+    with _LISTING_LOCK:
+        cached = _DIR_SCAN_CACHE.get(path)
+        epoch = _LISTING_EPOCH
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        if cached and cached[0] == mtime_ns:
+            files, subdirs = [], cached[2]
+            changed = False
+            for file_path, name, stat in cached[1]:
+                try:
+                    current = os.stat(file_path)
+                except OSError:
+                    # Removed since the listing (the next scan sees the new mtime)
+                    changed = True
+                    continue
+                if _file_signature(current) != _file_signature(stat):
+                    changed = True
+                files.append((file_path, name, current))
+            if not changed:
+                return cached[1], subdirs
+        else:
+            files, subdirs = [], []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in ALLOWED_EXTENSIONS:
+                        files.append((entry.path, entry.name, entry.stat()))
+    except OSError:
+        # Unreadable, or removed while the workspace was being walked
+        return [], []
+    with _LISTING_LOCK:
+        if epoch == _LISTING_EPOCH:
+            _DIR_SCAN_CACHE[path] = (mtime_ns, files, subdirs)
+        _DIR_SCAN_GENERATION += 1
+    return files, subdirs
+
+def _scan_document_files(root: str):
+    """
+    Yield (path, name, stat_result) for every allowed document under root.
+    Each directory's files are listed before descending into its subdirectories
+    (same order as Path.rglob); symlinked directories are not followed.
+    """
+    files, subdirs = _scan_directory(root)
+    yield from files
+    for subdir in subdirs:
+        yield from _scan_document_files(subdir)
+
+def find_document(root: str, name: str):
+    """
+    Return the path of the first document under root (in scan order) whose stem,
+    filename or relative path equals name, or None. The lookup index is rebuilt
+    only when one of the directory scans has changed.
+    """
+    global _FILE_INDEX
+    with _LISTING_LOCK:
+        generation = _DIR_SCAN_GENERATION
+        index_root, index_generation, index = _FILE_INDEX
+    files = list(_scan_document_files(root))  # revalidates every directory by mtime
+    with _LISTING_LOCK:
+        # Reuse the index if no directory was re-listed by this scan or another one
+        unchanged = generation == _DIR_SCAN_GENERATION
+    if index_root != root or index_generation != generation or not unchanged:
+        # Built from scans that may predate changes made by other threads: tagged
+        # with the generation read before scanning, so those trigger a rebuild
+        index = {}
+        for path, filename, _ in files:
+            for key in (os.path.splitext(filename)[0], filename, os.path.relpath(path, root)):
+                index.setdefault(key, path)
+        _FILE_INDEX = (root, generation, index)
+    return index.get(name)
+
+# Trigram index over the workspace's text documents; the search routes only read
+# the files it reports as possible content matches
+SEARCH_INDEX = TrigramIndex()
+TEXT_EXTENSIONS = frozenset({'md', 'markdown', 'txt'})
+
+def sync_search_index(md_files):
+    """
+    Bring SEARCH_INDEX up to date with the listed text documents. Returns a version
+    that changes whenever the workspace, the listing or an indexed document does;
+    the search result caches are keyed on it.
+    """
+    root = str(MD_FOLDER)
+    if SEARCH_INDEX.root != root:
+        # Each workspace keeps its index on disk, so switching back to one only
+        # re-reads the documents changed since
+        SEARCH_INDEX.open(root, str(LOG_DIR / f".index_{hashlib.sha1(root.encode('utf-8')).hexdigest()[:16]}.db"))
+    generation = SEARCH_INDEX.sync(os.path.join(root, f['relative_path']) for f in md_files if f['type'] in TEXT_EXTENSIONS)
+    with _LISTING_LOCK:
+        return (root, _DIR_SCAN_GENERATION, generation)
+
+def _folder_signature(path, subfolders, files):
+    """
+    (st_mtime_ns of path, {name: st_mtime_ns} for the given subfolders,
+    {name: (st_mtime_ns, st_size)} for the given files), or None if one is gone.
+    """
+    try:
+        return (os.stat(path).st_mtime_ns,
+                {name: os.stat(os.path.join(path, name)).st_mtime_ns for name in subfolders},
+                {name: _file_signature(os.stat(os.path.join(path, name))) for name in files})
+    except OSError:
+        return None
+
 def get_markdown_files(subdir=None, recursive=True):
     """
     Get markdown files and subdirectories.
     If recursive=True, returns flat list of all files (legacy behavior).
     If recursive=False, returns list of files and directories in subdir.
+    Results are cached until the underlying directories change; treat them as read-only.
     """
     md_path = Path(MD_FOLDER)
     if subdir:
@@ -315,76 +710,119 @@ def get_markdown_files(subdir=None, recursive=True):
             md_path.mkdir(parents=True, exist_ok=True)
         return []
     
+    root = str(MD_FOLDER)
     items = []
+    cache_key = (root, str(md_path), recursive)
+    with _LISTING_LOCK:
+        cached = _LISTING_CACHE.get(cache_key)
+        epoch = _LISTING_EPOCH
+        signature = _DIR_SCAN_GENERATION
     
     if recursive:
         # Legacy/Search Behavior: Recursive flat list of files
-        iterator = md_path.rglob('*')
+        files = list(_scan_document_files(str(md_path)))
+        # The scans above revalidate every directory; reuse the list if none was re-listed
+        with _LISTING_LOCK:
+            unchanged = signature == _DIR_SCAN_GENERATION
+        if cached and cached[0] == signature and unchanged:
+            return cached[1]
     else:
-        # Explorer Behavior: Direct children only
-        iterator = md_path.iterdir()
-
-    for file_path in iterator:
-        rel_path_obj = file_path.relative_to(Path(MD_FOLDER)) 
-        rel_path = str(rel_path_obj).replace('\\', '/')
-        
-        # Handle Directories (Only in non-recursive mode)
-        if not recursive and file_path.is_dir():
-            # Skip hidden folders
-            if file_path.name.startswith('.'): continue
-            
-            items.append({
-                'name': file_path.name,
-                'filename': file_path.name,
-                'relative_path': rel_path, # e.g. "subfolder"
-                'folder': str(Path(subdir) if subdir else ''),
-                'modified': datetime.fromtimestamp(file_path.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                'size': f"{len(list(file_path.iterdir()))} items",
-                'type': 'dir'
-            })
-            continue
-
-        # Handle Files
-        if file_path.is_file() and file_path.suffix.lower() in ALLOWED_EXTENSIONS:
-            stat = file_path.stat()
-            # Folder is the parent relative to MD_FOLDER
-            folder = str(rel_path_obj.parent).replace('\\', '/')
-            if folder == '.': folder = ''
+        # Explorer Behavior: Direct children only. Subfolder item counts depend on the
+        # subfolders' own listings, and file sizes and dates on in-place writes, so
+        # their mtimes (and file sizes) are part of the signature.
+        if cached and cached[0] == _folder_signature(md_path, cached[0][1], cached[0][2]):
+            return cached[1]
+        signature = (md_path.stat().st_mtime_ns, {}, {})
+        files = []
+        with os.scandir(md_path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    # Skip hidden folders
+                    if entry.name.startswith('.'): continue
+                    
+                    dir_stat = entry.stat()
+                    signature[1][entry.name] = dir_stat.st_mtime_ns
+                    items.append({
+                        'name': entry.name,
+                        'filename': entry.name,
+                        'relative_path': os.path.relpath(entry.path, root).replace('\\', '/'), # e.g. "subfolder"
+                        'folder': str(Path(subdir) if subdir else ''),
+                        'modified': _format_mtime(int(dir_stat.st_mtime)),
+                        'size': f"{len(os.listdir(entry.path))} items",
+                        'type': 'dir'
+                    })
+                elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in ALLOWED_EXTENSIONS:
+                    stat = entry.stat()
+                    signature[2][entry.name] = _file_signature(stat)
+                    files.append((entry.path, entry.name, stat))
+
+    # Handle Files
+    for file_path, filename, stat in files:
+        rel_path = os.path.relpath(file_path, root).replace('\\', '/')
+        name, ext = os.path.splitext(filename)
+        # Folder is the parent relative to MD_FOLDER
+        folder = rel_path.rpartition('/')[0]
             
-            # Format size
-            size_bytes = stat.st_size
-            if size_bytes < 1024:
-                size_str = f"{size_bytes} B"
-            elif size_bytes < 1024 * 1024:
-                size_str = f"{size_bytes / 1024:.1f} KB"
-            else:
-                size_str = f"{size_bytes / (1024 * 1024):.1f} MB"
-                
-            items.append({
-                'name': file_path.stem,
-                'filename': file_path.name,
-                'relative_path': rel_path,
-                'folder': folder,
-                'modified': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                'size': size_str,
-                'type': file_path.suffix.lower().strip('.')
-            })
+        items.append({
+            'name': name,
+            'filename': filename,
+            'relative_path': rel_path,
+            'folder': folder,
+            'modified': _format_mtime(int(stat.st_mtime)),
+            'size': _format_size(stat.st_size),
+            'type': ext.lower().strip('.'),
+            # Lowercased once here for the search routes' filename matches
+            'name_lower': name.lower(),
+            'filename_lower': filename.lower()
+        })
     
     # Sort items: Directories first, then files
     items.sort(key=lambda x: (x['type'] != 'dir', x['name'].lower()))
+    with _LISTING_LOCK:
+        if epoch == _LISTING_EPOCH:
+            _LISTING_CACHE[cache_key] = (signature, items)
     return items
 
+# Precompiled patterns for ASCII diagram/table conversion
+CODE_BLOCK_RE = re.compile(r'```\n(.*?)\n```', re.DOTALL)
+IP_ADDRESS_RE = re.compile(r'\d+\.\d+\.\d+\.\d+')
+COLUMN_SPLIT_RE = re.compile(r'\s{2,}')
+NON_IDENT_RE = re.compile(r'[^a-zA-Z0-9_]')
+PARENTHETICAL_RE = re.compile(r'\s*\([^)]*\)')
+TIMING_RE = re.compile(r'(T\+\d+\w+)')
+NOTE_GLYPHS_RE = re.compile(r'[┌├└─]')
+# Flow arrows: group 1 = rightward, group 2 = leftward. Lookaheads let '<──>' report both.
+ARROW_RE = re.compile(r'(?=(──>|→))|(?=(<──|←))')
+TOPOLOGY_NODE_PATTERNS = [
+    re.compile(r'(UAC|UAS)\s*\(([^)]+)\)', re.IGNORECASE),
+    re.compile(r'(Crestone Router|Router|Server|Gateway|Proxy)\s*(\d+)?\s*\(([^)]+)\)', re.IGNORECASE),
+    re.compile(r'(Crestone Router \d+)', re.IGNORECASE),
+]
+
+def _arrow_direction(line):
+    """Classify a flow line: 1 = rightward arrow, -1 = only leftward arrows, 0 = no arrow."""
+    direction = 0
+    for m in ARROW_RE.finditer(line):
+        if m.group(1):
+            return 1
+        direction = -1
+    return direction
+
 def convert_ascii_tables_to_markdown(content):
     """Convert ASCII tables, network topology, and SIP flow diagrams to appropriate formats."""
-    import re
     
     def get_preceding_heading(content, code_block_start):
         """Get the heading that precedes a code block."""
-        lines_before = content[:code_block_start].split('\n')
-        # Look backwards for the nearest heading
-        for line in reversed(lines_before[-10:]):  # Check last 10 lines
-            if line.startswith('#'):
-                return line.strip()
+        # Walk back line by line from the block start instead of splitting the
+        # whole prefix, so each lookup costs at most 10 lines (not O(position)).
+        line_end = code_block_start
+        for _ in range(10):  # Check last 10 lines
+            line_start = content.rfind('\n', 0, line_end) + 1
+            if content.startswith('#', line_start, line_end):
+                return content[line_start:line_end].strip()
+            if line_start == 0:
+                break
+            line_end = line_start - 1
         return ''
     
     def should_convert_topology(heading):
@@ -399,58 +837,48 @@ def convert_ascii_tables_to_markdown(content):
         heading_lower = heading.lower()
         return any(keyword in heading_lower for keyword in flow_keywords)
     
-    def detect_network_topology(lines):
+    def detect_network_topology(text):
         """Detect if this is a network topology diagram."""
-        text = '\n'.join(lines)
         # Check for topology indicators
         topology_indicators = ['UAC', 'UAS', 'Router', 'Server', 'Switch', 'Gateway', 'Proxy']
         box_chars = ['┌', '─', '┐', '│', '└', '┘', '├', '┤', '┬', '┴']
         
-        has_boxes = sum(1 for char in box_chars if char in text) >= 5
-        has_topology_terms = sum(1 for term in topology_indicators if term in text) >= 2
-        has_ip_addresses = bool(re.search(r'\d+\.\d+\.\d+\.\d+', text))
-        
         # Must have boxes AND either topology terms or IP addresses
-        return has_boxes and (has_topology_terms or has_ip_addresses)
+        if not _contains_at_least(box_chars, text, 5):
+            return False
+        return _contains_at_least(topology_indicators, text, 2) or bool(IP_ADDRESS_RE.search(text))
     
-    def detect_sip_signaling(lines):
+    def detect_sip_signaling(lines, text):
         """Detect if this is a SIP signaling flow diagram using SIP knowledge."""
-        text = '\n'.join(lines)
-        text_upper = text.upper()
+        # Flow indicators (cheap checks first)
+        has_arrows = ARROW_RE.search(text) is not None
+        has_timing = 'T+' in text or 'TIME' in lines[0] if lines else False
+        has_process_notes = '┌' in text or '├' in text or '└' in text
         
-        # Check for SIP request methods
-        request_count = sum(1 for method in SIP_KNOWLEDGE['request_methods'] if method in text_upper)
+        # Strong indicators: arrows + (timing OR process notes) + (requests OR responses)
+        if not has_arrows or not (has_timing or has_process_notes):
+            return False
         
-        # Check for SIP response codes
-        response_count = 0
-        for code, desc in SIP_KNOWLEDGE['response_codes'].items():
-            if f'{code} {desc}' in text or code in text or desc.upper() in text_upper:
-                response_count += 1
+        text_upper = text.upper()
         
-        # Flow indicators
-        has_arrows = any(arrow in text for arrow in ['──>', '<──', '→', '←', '────>', '<────'])
-        has_timing = 'T+' in text or 'TIME' in lines[0] if lines else False
-        has_process_notes = any(char in text for char in ['┌', '├', '└'])
+        # Check for SIP request methods
+        if _has_distinct_keywords(SIP_METHOD_RE, text_upper, 2):
+            return True
         
-        # Strong indicators: arrows + (timing OR process notes) + (requests OR responses)
-        return has_arrows and (has_timing or has_process_notes) and (request_count >= 2 or response_count >= 2)
+        # Check for SIP response codes (by code or by reason phrase)
+        response_codes = set()
+        return (_has_distinct_keywords(SIP_CODE_RE, text, 2, seen=response_codes)
+                or _has_distinct_keywords(SIP_REASON_RE, text_upper, 2, seen=response_codes,
+                                          key=SIP_REASON_TO_CODE.__getitem__))
     
-    def convert_topology_to_mermaid(lines):
+    def convert_topology_to_mermaid(text):
         """Convert network topology to Mermaid flowchart."""
-        text = '\n'.join(lines)
-        
         # Extract network elements
-        patterns = [
-            r'(UAC|UAS)\s*\(([^)]+)\)',
-            r'(Crestone Router|Router|Server|Gateway|Proxy)\s*(\d+)?\s*\(([^)]+)\)',
-            r'(Crestone Router \d+)',
-        ]
-        
         nodes = []
         node_details = {}
         
-        for pattern in patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
+        for pattern in TOPOLOGY_NODE_PATTERNS:
+            matches = pattern.finditer(text)
             for match in matches:
                 full_match = match.group(0)
                 # Extract name and details
@@ -497,7 +925,7 @@ def convert_ascii_tables_to_markdown(content):
         # Find the line with participant names
         for i, line in enumerate(lines[:5]):
             if not line.strip().startswith('-') and 'Time' not in line:
-                parts = re.split(r'\s{2,}', line.strip())
+                parts = COLUMN_SPLIT_RE.split(line.strip())
                 if len(parts) >= 3:
                     participants = [p.strip() for p in parts if p.strip() and not p.startswith('T+')]
                     break
@@ -505,7 +933,7 @@ def convert_ascii_tables_to_markdown(content):
         # Clean participant names (remove IP addresses)
         clean_participants = []
         for p in participants:
-            clean_p = re.sub(r'\s*\([^)]*\)', '', p).strip()
+            clean_p = PARENTHETICAL_RE.sub('', p).strip()
             if clean_p and clean_p.lower() not in ['time']:
                 clean_participants.append(clean_p)
         
@@ -517,9 +945,11 @@ def convert_ascii_tables_to_markdown(content):
         # Build Mermaid sequence diagram
         mermaid_lines = ['```mermaid', 'sequenceDiagram']
         
+        # Mermaid-safe identifiers, computed once per participant
+        safe_names = [NON_IDENT_RE.sub('_', p) for p in participants]
+        
         # Add participants
-        for p in participants:
-            safe_name = re.sub(r'[^a-zA-Z0-9_]', '_', p)
+        for safe_name, p in zip(safe_names, participants):
             mermaid_lines.append(f'    participant {safe_name} as {p}')
         
         # Parse message flows using SIP knowledge
@@ -529,75 +959,73 @@ def convert_ascii_tables_to_markdown(content):
                 continue
             
             # Extract timing
-            time_match = re.match(r'(T\+\d+\w+)', line)
+            time_match = TIMING_RE.match(line)
             if time_match:
                 current_time = time_match.group(1)
             
+            direction = _arrow_direction(line)
+            
             # Right arrow messages
-            if '──>' in line or '───>' in line or '────>' in line or '→' in line:
+            if direction > 0:
                 message = 'Message'
                 
                 # Check SIP request methods
-                for method in SIP_KNOWLEDGE['request_methods']:
-                    if method in line.upper():
-                        message = method
-                        if current_time:
-                            message = f'{method} [{current_time}]'
-                        break
+                method = _first_keyword(_matched_keywords(SIP_METHOD_RE, line.upper()), SIP_METHOD_RANK)
+                if method:
+                    message = method
+                    if current_time:
+                        message = f'{method} [{current_time}]'
                 
                 # Check SIP response codes
                 if message == 'Message':
-                    for code, desc in SIP_KNOWLEDGE['response_codes'].items():
-                        if f'{code} {desc}' in line or f'{code}' in line[:10]:
-                            message = f'{code} {desc}'
-                            if current_time:
-                                message = f'{code} {desc} [{current_time}]'
-                            break
+                    code = _response_code_in_line(line, 10)
+                    if code:
+                        message = SIP_RESPONSE_LOOKUP[code]
+                        if current_time:
+                            message = f'{message} [{current_time}]'
                 
                 # Extract additional info from line (RTP, SRTP, etc.)
-                for attr in SIP_KNOWLEDGE['sdp_attributes']:
-                    if attr in line and attr not in message:
+                for attr in sorted(_matched_keywords(SDP_ATTRIBUTE_RE, line), key=SDP_ATTRIBUTE_RANK.__getitem__):
+                    if attr not in message:
                         message = f'{message} ({attr})'
                         break
                 
                 if len(participants) >= 2:
                     for i in range(len(participants) - 1):
-                        src = re.sub(r'[^a-zA-Z0-9_]', '_', participants[i])
-                        dst = re.sub(r'[^a-zA-Z0-9_]', '_', participants[i + 1])
+                        src = safe_names[i]
+                        dst = safe_names[i + 1]
                         mermaid_lines.append(f'    {src}->>{dst}: {message}')
                         break
             
             # Left arrow responses
-            elif '<──' in line or '<───' in line or '<────' in line or '←' in line:
+            elif direction < 0:
                 message = 'Response'
                 
                 # Check SIP response codes
-                for code, desc in SIP_KNOWLEDGE['response_codes'].items():
-                    if f'{code} {desc}' in line or f'{code}' in line[:20]:
-                        message = f'{code} {desc}'
-                        if current_time:
-                            message = f'{code} {desc} [{current_time}]'
-                        break
+                code = _response_code_in_line(line, 20)
+                if code:
+                    message = SIP_RESPONSE_LOOKUP[code]
+                    if current_time:
+                        message = f'{message} [{current_time}]'
                 
                 # Check for request methods in responses
                 if message == 'Response':
-                    for method in SIP_KNOWLEDGE['request_methods']:
-                        if method in line.upper():
-                            message = f'200 OK ({method})'
-                            break
+                    method = _first_keyword(_matched_keywords(SIP_METHOD_RE, line.upper()), SIP_METHOD_RANK)
+                    if method:
+                        message = f'200 OK ({method})'
                 
                 if len(participants) >= 2:
                     for i in range(len(participants) - 1, 0, -1):
-                        src = re.sub(r'[^a-zA-Z0-9_]', '_', participants[i])
-                        dst = re.sub(r'[^a-zA-Z0-9_]', '_', participants[i - 1])
+                        src = safe_names[i]
+                        dst = safe_names[i - 1]
                         mermaid_lines.append(f'    {src}-->>{dst}: {message}')
                         break
             
             # Process notes
-            elif any(char in line for char in ['┌', '├', '└']):
-                note_text = re.sub(r'[┌├└─]', '', line).strip()
+            elif '┌' in line or '├' in line or '└' in line:
+                note_text = NOTE_GLYPHS_RE.sub('', line).strip()
                 if note_text and len(note_text) > 3 and len(participants) >= 2:
-                    participant = re.sub(r'[^a-zA-Z0-9_]', '_', participants[1])
+                    participant = safe_names[1]
                     # Limit note length
                     if len(note_text) > 50:
                         note_text = note_text[:47] + '...'
@@ -606,28 +1034,25 @@ def convert_ascii_tables_to_markdown(content):
         mermaid_lines.append('```')
         return '\n'.join(mermaid_lines)
     
-    def detect_simple_table(lines):
-        """Detect if this is a simple data table."""
+    def split_table_rows(lines):
+        """Split lines into columns (2+ spaces apart), keeping only multi-column rows."""
         potential_table = []
         for line in lines:
-            cols = re.split(r'\s{2,}', line.strip())
+            cols = COLUMN_SPLIT_RE.split(line.strip())
             if len(cols) > 1:
                 potential_table.append(cols)
-        
+        return potential_table
+    
+    def detect_simple_table(potential_table):
+        """Detect if this is a simple data table."""
         if len(potential_table) >= 2:
             col_counts = [len(row) for row in potential_table]
             # Check for consistent columns
             return max(col_counts) - min(col_counts) <= 1
         return False
     
-    def convert_table_to_markdown(lines):
+    def convert_table_to_markdown(potential_table):
         """Convert ASCII table to markdown table."""
-        potential_table = []
-        for line in lines:
-            cols = re.split(r'\s{2,}', line.strip())
-            if len(cols) > 1:
-                potential_table.append(cols)
-        
         max_cols = max(len(row) for row in potential_table)
         table_lines = []
         
@@ -650,7 +1075,9 @@ def convert_ascii_tables_to_markdown(content):
     
     def process_code_block_with_context(match, preceding_heading):
         code_content = match.group(1)
-        lines = code_content.strip().split('\n')
+        # Block text shared by the detectors/converters below (no per-detector re-join)
+        text = code_content.strip()
+        lines = text.split('\n')
         
         if len(lines) < 2:
             return match.group(0)
@@ -660,29 +1087,30 @@ def convert_ascii_tables_to_markdown(content):
         heading_suggests_signaling = should_convert_signaling(preceding_heading)
         
         # Priority 1: Heading suggests topology + content matches
-        if heading_suggests_topology and detect_network_topology(lines):
-            converted = convert_topology_to_mermaid(lines)
+        if heading_suggests_topology and detect_network_topology(text):
+            converted = convert_topology_to_mermaid(text)
             if converted:
                 return '\n' + converted + '\n'
         
         # Priority 2: Heading suggests signaling + content matches  
-        if heading_suggests_signaling and detect_sip_signaling(lines):
+        if heading_suggests_signaling and detect_sip_signaling(lines, text):
             return '\n' + convert_sip_signaling_to_mermaid(lines) + '\n'
         
         # Priority 3: Auto-detect without heading context (stricter criteria)
         if not heading_suggests_topology and not heading_suggests_signaling:
             # Only convert if very strong signals
-            if detect_network_topology(lines):
-                converted = convert_topology_to_mermaid(lines)
+            if detect_network_topology(text):
+                converted = convert_topology_to_mermaid(text)
                 if converted:
                     return '\n' + converted + '\n'
             
-            if detect_sip_signaling(lines):
+            if detect_sip_signaling(lines, text):
                 return '\n' + convert_sip_signaling_to_mermaid(lines) + '\n'
         
-        # Priority 4: Check for simple table
-        if detect_simple_table(lines):
-            return convert_table_to_markdown(lines)
+        # Priority 4: Check for simple table (rows are split once and reused)
+        potential_table = split_table_rows(lines)
+        if detect_simple_table(potential_table):
+            return convert_table_to_markdown(potential_table)
         
         # Keep original
         return match.group(0)
@@ -691,7 +1119,7 @@ def convert_ascii_tables_to_markdown(content):
     result = []
     last_end = 0
     
-    for match in re.finditer(r'```\n(.*?)\n```', content, flags=re.DOTALL):
+    for match in CODE_BLOCK_RE.finditer(content):
         # Add content before this code block
         result.append(content[last_end:match.start()])
         
@@ -713,111 +1141,316 @@ def convert_ascii_tables_to_markdown(content):
 # HELPER FUNCTIONS FOR NEW FEATURES (v1.4.0)
 # ============================================================================
 
+# Word files up to this size are read into memory in one go before conversion
+DOCX_IN_MEMORY_MAX_BYTES = 50 * 1024 * 1024
+
 def convert_docx_to_html(docx_path: Path) -> str:
     """Convert Word document to HTML using mammoth."""
-    if not WORD_INPUT_AVAILABLE:
+    mammoth = optional_import('mammoth', 'Word input')
+    if mammoth is None:
         raise Exception("mammoth library not available")
     
     logger.info(f"Converting Word document: {docx_path}")
     try:
-        with open(docx_path, "rb") as docx_file:
-            result = mammoth.convert_to_html(docx_file)
-            html_content = result.value
-            
-            # Log any messages/warnings from conversion
-            if result.messages:
-                for msg in result.messages:
-                    logger.warning(f"Mammoth conversion message: {msg}")
-            
-            logger.info(f"Successfully converted Word document, size: {len(html_content)} bytes")
-            return html_content
+        if os.path.getsize(docx_path) <= DOCX_IN_MEMORY_MAX_BYTES:
+            # One read; the zip reader inside mammoth then seeks in memory
+            result = mammoth.convert_to_html(io.BytesIO(Path(docx_path).read_bytes()))
+        else:
+            with open(docx_path, "rb") as docx_file:
+                result = mammoth.convert_to_html(docx_file)
+        html_content = result.value
+        
+        # Log any messages/warnings from conversion
+        if result.messages:
+            for msg in result.messages:
+                logger.warning(f"Mammoth conversion message: {msg}")
+        
+        logger.info(f"Successfully converted Word document, size: {len(html_content)} bytes")
+        return html_content
     except Exception as e:
         logger.error(f"Failed to convert Word document: {e}", exc_info=True)
         raise
 
-def process_links_in_html(html_content: str, base_path: Path = None, is_preview: bool = False) -> str:
+# Anchor open tags, skipping comments and script/style bodies the way an HTML parser would
+LINK_TAG_RE = re.compile(
+    r'<!--(?:.*?-->|.*)|<(script|style)\b(?:.*?</\1\s*>|.*)|<a(\s[^<>]*)?>',
+    re.IGNORECASE | re.DOTALL
+)
+TAG_ATTR_RE = re.compile(r'''\s+([^\s"'<>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?''')
+TAG_END_RE = re.compile(r'\s*/?\s*')
+# Only anchors with an href are ever rewritten (attribute names are case-insensitive)
+HREF_RE = re.compile('href', re.I)
+
+def parse_tag_attrs(attr_text: str):
+    """
+    Parse the attribute text of an open tag into an ordered dict of unescaped values
+    (class split into a list, as BeautifulSoup does). Returns None for markup the
+    regex path should not guess at, such as stray quotes.
+    """
+    attrs = {}
+    pos = 0
+    while True:
+        match = TAG_ATTR_RE.match(attr_text, pos)
+        if not match:
+            break
+        name = match.group(1).lower()
+        value = next((v for v in match.group(2, 3, 4) if v is not None), None)
+        if name not in attrs:
+            if value is not None:
+                value = html_module.unescape(value)
+            attrs[name] = value.split() if name == 'class' and value is not None else value
+        pos = match.end()
+    if not TAG_END_RE.fullmatch(attr_text, pos):
+        return None
+    return attrs
+
+def format_link_tag(attrs: dict) -> str:
+    """Serialize anchor attributes back into an open tag."""
+    parts = ['<a']
+    for name, value in attrs.items():
+        if value is None:
+            parts.append(f' {name}')
+        else:
+            if isinstance(value, list):
+                value = ' '.join(value)
+            parts.append(f' {name}="{html_module.escape(value)}"')
+    parts.append('>')
+    return ''.join(parts)
+
+def listing_exists(listed_mtimes: dict = None):
+    """
+    Return an exists(path) check that lists each parent directory once and answers
+    from the listing. Names missing from it (e.g. case differences on Windows) are
+    confirmed with a real stat, so the answer matches os.path.exists.
+    If listed_mtimes is given, it receives {directory: st_mtime_ns} (None if it
+    can't be read) for every directory listed, taken before listing it.
+    """
+    listings = {}
+    
+    def exists(path: str) -> bool:
+        parent, name = os.path.split(path)
+        names = listings.get(parent)
+        if names is None:
+            try:
+                if listed_mtimes is not None:
+                    listed_mtimes[parent] = None
+                    listed_mtimes[parent] = os.stat(parent).st_mtime_ns
+                with os.scandir(parent) as entries:
+                    names = {entry.name for entry in entries}
+            except OSError:
+                names = set()
+            listings[parent] = names
+        return name in names or os.path.exists(path)
+    
+    return exists
+
+def rewrite_link(a_tag, base_dir: str, workspace_prefix: str, exists=os.path.exists) -> bool:
+    """
+    Apply the link rules to one anchor's attributes (a BeautifulSoup tag or an
+    attribute dict). Returns True if anything changed.
+    Relative links are resolved lexically against base_dir and checked with
+    exists(); workspace_prefix is the workspace path ending in a separator.
+    """
+    href = a_tag.get('href', '')
+    
+    if not href:
+        return False
+    
+    # Branch on the first character so most links need at most one prefix test
+    first = href[0]
+    
+    # External links - open in new tab
+    if first == 'h' and href.startswith(('http://', 'https://')):
+        a_tag['target'] = '_blank'
+        a_tag['rel'] = 'noopener noreferrer'
+        logger.debug("External link: %s", href)  # lazy args: formatted only if DEBUG is on
+        return True
+    
+    # Anchor links within document, absolute paths and email links work as-is
+    if first == '#' or first == '/' or (first == 'm' and href.startswith('mailto:')):
+        return False
+    
+    # Relative links - resolve based on document location
+    if not base_dir:
+        return False
+    try:
+        # Resolve relative to document's directory; a #fragment is kept for the new
+        # href but is not part of the target path
+        path_part, hash_mark, fragment = href.partition('#')
+        resolved = os.path.normpath(os.path.join(base_dir, path_part))
+        
+        # Check if it is within the workspace and exists
+        if resolved.startswith(workspace_prefix) and exists(resolved):
+            rel_path = resolved[len(workspace_prefix):]
+            a_tag['href'] = f'/file/{rel_path}{hash_mark}{fragment}'
+            logger.debug("Resolved relative link %s -> /file/%s", href, rel_path)
+        else:
+            # Link target doesn't exist or outside workspace
+            a_tag['class'] = (a_tag.get('class', []) or []) + ['broken-link']
+            a_tag['title'] = 'Link target not found'
+            a_tag['style'] = 'color: #dc2626; text-decoration: underline dotted;'
+            logger.warning("Broken link: %s (resolved to %s)", href, resolved)
+        return True
+    except Exception as e:
+        logger.warning("Failed to resolve link %s: %s", href, e)
+        return False
+
+def process_links_in_html(html_content: str, base_path: Path = None, is_preview: bool = False,
+                          listed_mtimes: dict = None) -> str:
     """
     Process all links in HTML to ensure they are clickable and properly resolved.
     - External links open in new tab
     - Relative links resolved based on document location
+    Preview results are memoized: live preview re-posts the same content, while
+    file views are already cached per file version by render_document_from_file.
+    If listed_mtimes is given, it receives the mtime of every directory the link
+    check listed (see listing_exists).
+    """
+    # No anchor tags at all (common for converted Word files), or none with an
+    # href (heading anchors, <abbr>, <aside>...): nothing to rewrite
+    if '<a' not in html_content and '<A' not in html_content:
+        return html_content
+    if not HREF_RE.search(html_content):
+        return html_content
+    if not is_preview:
+        exists = listing_exists(listed_mtimes) if listed_mtimes is not None else None
+        return rewrite_links(html_content, base_path, MD_FOLDER, exists)
+    
+    key = (hashlib.blake2b(html_content.encode('utf-8'), digest_size=16).digest(),
+           str(base_path) if base_path else None, str(MD_FOLDER))
+    with _link_rewrite_lock:
+        cached = _LINK_REWRITE_CACHE.get(key)
+    # Link checks answered from a directory listing go stale when that directory changes
+    if cached is not None and _directory_mtimes(cached[0]) == cached[0]:
+        with _link_rewrite_lock:
+            if key in _LINK_REWRITE_CACHE:
+                _LINK_REWRITE_CACHE.move_to_end(key)
+        return cached[1]
+    
+    listed_mtimes = {}
+    processed = rewrite_links(html_content, base_path, MD_FOLDER, listing_exists(listed_mtimes))
+    with _link_rewrite_lock:
+        _LINK_REWRITE_CACHE[key] = (listed_mtimes, processed)
+        _LINK_REWRITE_CACHE.move_to_end(key)
+        if len(_LINK_REWRITE_CACHE) > LINK_REWRITE_CACHE_SIZE:
+            _LINK_REWRITE_CACHE.popitem(last=False)
+    return processed
+
+# Preview link rewrites keyed by a digest of the HTML (not the HTML itself, so large
+# documents are not kept alive) plus base and workspace paths:
+# key -> ({listed directory: st_mtime_ns}, rewritten HTML)
+_LINK_REWRITE_CACHE = OrderedDict()
+LINK_REWRITE_CACHE_SIZE = 32
+_link_rewrite_lock = threading.Lock()
+
+def _directory_mtimes(directories):
+    """{directory: st_mtime_ns, or None if it can't be read} for the given directories."""
+    mtimes = {}
+    for directory in directories:
+        try:
+            mtimes[directory] = os.stat(directory).st_mtime_ns
+        except OSError:
+            mtimes[directory] = None
+    return mtimes
+
+def rewrite_links(html_content: str, base_path: Path, workspace: Path, exists=None) -> str:
+    """
+    Rewrite anchor open tags in place with a single regex pass; markup with
+    unusual quoting falls back to a BeautifulSoup parse. exists defaults to a
+    fresh listing_exists() check.
     """
+    # Resolve the workspace once (it may be configured relative or through a
+    # symlink) and express the document's directory under that resolved root
+    workspace_abs = os.path.join(os.path.abspath(workspace), '')
+    workspace_prefix = os.path.join(str(Path(workspace).resolve()), '')
+    base_dir = None
+    if base_path:
+        base_abs = os.path.join(os.path.abspath(base_path), '')
+        if base_abs.startswith(workspace_abs):
+            base_dir = workspace_prefix + base_abs[len(workspace_abs):]
+        else:
+            base_dir = str(Path(base_path).resolve())
+    if exists is None:
+        exists = listing_exists()
+    unusual = False
+    
+    def rewrite_tag(match):
+        nonlocal unusual
+        if match.group(0)[:2].lower() != '<a':
+            return match.group(0)  # comment or script/style body
+        attrs = parse_tag_attrs(match.group(2) or '')
+        if attrs is None:
+            unusual = True
+            return match.group(0)
+        if not rewrite_link(attrs, base_dir, workspace_prefix, exists):
+            return match.group(0)
+        return format_link_tag(attrs)
+    
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        processed = LINK_TAG_RE.sub(rewrite_tag, html_content)
+    except Exception as e:
+        logger.error(f"Error processing links: {e}", exc_info=True)
+        return html_content  # Return original if processing fails
+    if not unusual:
+        return processed
+    return process_links_with_soup(html_content, base_dir, workspace_prefix, exists)
+
+def process_links_with_soup(html_content: str, base_dir: str, workspace_prefix: str, exists) -> str:
+    """BeautifulSoup fallback for process_links_in_html."""
+    bs4 = optional_import('bs4', 'Link processing')
+    if bs4 is None:
+        return html_content
+    
+    try:
+        # Cheap pre-pass that only materializes <a href> tags: mailto, in-page and
+        # absolute links are left as-is, so without any others there is nothing
+        # to rewrite and the full tree build (and re-serialization) is skipped.
+        anchors = bs4.BeautifulSoup(html_content, html_parser_name(), parse_only=bs4.SoupStrainer('a', href=True))
+        if not any(a['href'] and not a['href'].startswith(('mailto:', '#', '/')) for a in anchors.find_all('a')):
+            return html_content
         
-        for a_tag in soup.find_all('a'):
-            href = a_tag.get('href', '')
-            
-            if not href:
-                continue
-            
-            # External links - open in new tab
-            if href.startswith('http://') or href.startswith('https://'):
-                a_tag['target'] = '_blank'
-                a_tag['rel'] = 'noopener noreferrer'
-                logger.debug(f"External link: {href}")
-            
-            # Email links
-            elif href.startswith('mailto:'):
-                pass  # Already functional
-            
-            # Anchor links within document
-            elif href.startswith('#'):
-                pass  # Work as-is
-            
-            # Absolute paths
-            elif href.startswith('/'):
-                pass  # Already absolute
-            
-            # Relative links - resolve based on document location
-            else:
-                if base_path:
-                    try:
-                        # Resolve relative to document's directory
-                        resolved = (base_path / href).resolve()
-                        
-                        # Check if it exists and is within MD_FOLDER
-                        if resolved.exists() and resolved.is_relative_to(MD_FOLDER):
-                            rel_path = resolved.relative_to(MD_FOLDER)
-                            a_tag['href'] = f'/file/{rel_path}'
-                            logger.debug(f"Resolved relative link {href} -> /file/{rel_path}")
-                        else:
-                            # Link target doesn't exist or outside workspace
-                            a_tag['class'] = (a_tag.get('class', []) or []) + ['broken-link']
-                            a_tag['title'] = 'Link target not found'
-                            a_tag['style'] = 'color: #dc2626; text-decoration: underline dotted;'
-                            logger.warning(f"Broken link: {href} (resolved to {resolved})")
-                    except Exception as e:
-                        logger.warning(f"Failed to resolve link {href}: {e}")
-        
-        return str(soup)
+        if html_parser_name() == 'lxml':
+            # lxml always builds a full document; parsing inside an explicit <body>
+            # keeps leading text and comments in place so the fragment round-trips.
+            soup = bs4.BeautifulSoup(f'<body>{html_content}</body>', 'lxml')
+            root = soup.body
+        else:
+            soup = bs4.BeautifulSoup(html_content, 'html.parser')
+            root = soup
+        
+        for a_tag in root.find_all('a'):
+            rewrite_link(a_tag, base_dir, workspace_prefix, exists)
+        
+        return str(soup) if root is soup else root.decode_contents()
     except Exception as e:
         logger.error(f"Error processing links: {e}", exc_info=True)
         return html_content  # Return original if processing fails
 
+# Blocked workspace directories (Windows) as normalized, separator-terminated
+# prefixes, so a single startswith covers both the directory and its children
+BLOCKED_WORKSPACE_PREFIXES = tuple(
+    os.path.normcase(str(blocked_path)) + os.sep
+    for blocked_path in (
+        Path('C:\\Windows'),
+        Path('C:\\Program Files'),
+        Path('C:\\Program Files (x86)'),
+        Path.home() / 'AppData',
+    )
+)
+
 def is_safe_workspace(path: Path) -> bool:
     """Check if directory is safe to use as workspace."""
     try:
         path = path.resolve()
         
-        # Blocked directories (Windows)
-        blocked = [
-            Path('C:\\Windows'),
-            Path('C:\\Program Files'),
-            Path('C:\\Program Files (x86)'),
-            Path.home() / 'AppData',
-        ]
-        
         # Check against blocked paths
-        for blocked_path in blocked:
-            try:
-                if path == blocked_path or path.is_relative_to(blocked_path):
-                    return False
-            except:
-                pass
+        if (os.path.normcase(str(path)) + os.sep).startswith(BLOCKED_WORKSPACE_PREFIXES):
+            return False
         
-        # Must have read permission
+        # Must have read permission (opening the listing and reading one entry is enough)
         try:
-            list(path.iterdir())  # Test read access
+            with os.scandir(path) as entries:
+                next(entries, None)
         except PermissionError:
             return False
         
@@ -826,42 +1459,75 @@ def is_safe_workspace(path: Path) -> bool:
         logger.error(f"Error checking workspace safety: {e}")
         return False
 
+# IPv4 addresses (octets 0-255, not part of a longer dotted number such as a
+# version string), then Windows and POSIX file paths, matched in one pass
+LOG_SENSITIVE_RE = re.compile(
+    r'(?P<ip>(?<![\d.])(?:(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(?!\.?\d))'
+    r'|[A-Z]:\\[^\s\'"]+'
+    r'|/[^\s\'"]+/[^\s\'"]+'
+)
+
+def _log_placeholder(match) -> str:
+    return '<IP_ADDRESS>' if match.lastgroup == 'ip' else '<PATH>'
+
 def sanitize_log_content(content: str) -> str:
-    """Remove sensitive information from logs."""
-    # Remove IP addresses
-    content = re.sub(r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b', '<IP_ADDRESS>', content)
-    # Remove full file paths - keep only filenames
-    content = re.sub(r'[A-Z]:\\[^\s\'"]+', '<PATH>', content)
-    content = re.sub(r'/[^\s\'"]+/[^\s\'"]+', '<PATH>', content)
-    return content
+    """Remove sensitive information from logs (IP addresses and full file paths)."""
+    return LOG_SENSITIVE_RE.sub(_log_placeholder, content)
 
 # wkhtmltopdf management functions
 WKHTMLTOPDF_VERSION = '0.12.6'
 WKHTMLTOPDF_DOWNLOAD_URL = f'https://github.com/wkhtmltopdf/packaging/releases/download/{WKHTMLTOPDF_VERSION}/wkhtmltox-{WKHTMLTOPDF_VERSION}-1.msvc2015-win64.exe'
 
+# Common wkhtmltopdf install locations, checked in order (one stat each; every
+# candidate lives in its own directory)
+WKHTMLTOPDF_CANDIDATES = (
+    r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe',
+    r'C:\Program Files (x86)\wkhtmltopdf\bin\wkhtmltopdf.exe',
+    str(PROJECT_ROOT / 'bin' / 'wkhtmltopdf.exe'),  # Portable
+    str(PROJECT_ROOT / 'bin' / 'bin' / 'wkhtmltopdf.exe'),  # Portable, as extracted by install_wkhtmltopdf_portable
+)
+
+# wkhtmltopdf path remembered after the first successful lookup (or install)
+WKHTMLTOPDF_PATH = None
+
+def forget_wkhtmltopdf():
+    """Drop the cached wkhtmltopdf location and pdfkit configurations."""
+    global WKHTMLTOPDF_PATH
+    WKHTMLTOPDF_PATH = None
+    pdfkit_configuration.cache_clear()
+
 def find_wkhtmltopdf() -> str:
-    """Find wkhtmltopdf executable, return path or None."""
-    # Check common paths
-    possible_paths = [
-        r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe',
-        r'C:\Program Files (x86)\wkhtmltopdf\bin\wkhtmltopdf.exe',
-        PROJECT_ROOT / 'bin' / 'wkhtmltopdf.exe',  # Portable
-    ]
-    
-    for path in possible_paths:
-        path_obj = Path(path) if not isinstance(path, Path) else path
-        if path_obj.exists():
-            logger.info(f"Found wkhtmltopdf at {path_obj}")
-            return str(path_obj)
+    """Find wkhtmltopdf executable, return path or None. A hit is cached for the process."""
+    global WKHTMLTOPDF_PATH
+    if WKHTMLTOPDF_PATH is None:
+        WKHTMLTOPDF_PATH = locate_wkhtmltopdf()
+    return WKHTMLTOPDF_PATH
+
+@lru_cache(maxsize=4)
+def pdfkit_configuration(wkhtmltopdf_path: str):
+    """pdfkit configuration for a wkhtmltopdf binary, built once per path."""
+    return optional_import('pdfkit', 'PDF export').configuration(wkhtmltopdf=wkhtmltopdf_path)
+
+class TemporaryDownload(io.FileIO):
+    """A temporary file opened for send_file; the file is deleted once the response closes it."""
+    def close(self):
+        super().close()
+        Path(self.name).unlink(missing_ok=True)
+
+def locate_wkhtmltopdf() -> str:
+    """Search the common install locations and PATH for wkhtmltopdf."""
+    for path in WKHTMLTOPDF_CANDIDATES:
+        if os.path.isfile(path):
+            logger.info(f"Found wkhtmltopdf at {path}")
+            return path
     
     # Check PATH
     try:
-        import shutil
         path_exe = shutil.which('wkhtmltopdf')
         if path_exe:
             logger.info(f"Found wkhtmltopdf in PATH: {path_exe}")
             return path_exe
-    except:
+    except OSError:
         pass
     
     logger.warning("wkhtmltopdf not found")
@@ -869,21 +1535,41 @@ def find_wkhtmltopdf() -> str:
 
 def install_wkhtmltopdf_portable() -> str:
     """Download portable version and extract to app folder."""
+    global WKHTMLTOPDF_PATH
     try:
         logger.info("Installing portable wkhtmltopdf...")
         portable_url = f'https://github.com/wkhtmltopdf/packaging/releases/download/{WKHTMLTOPDF_VERSION}/wkhtmltox-{WKHTMLTOPDF_VERSION}-1.msvc2015-win64.zip'
         
-        import zipfile
+        import urllib.request
         zip_path = tempfile.mktemp(suffix='.zip')
         logger.info(f"Downloading from {portable_url}")
-        urllib.request.urlretrieve(portable_url, zip_path)
+        # Stream to disk in 1 MiB chunks, hashing as we go
+        digest = hashlib.sha256()
+        with urllib.request.urlopen(portable_url) as response, open(zip_path, 'wb') as f:
+            while chunk := response.read(1 << 20):
+                digest.update(chunk)
+                f.write(chunk)
+        logger.info(f"Downloaded {zip_path} (sha256 {digest.hexdigest()})")
         
         bin_folder = PROJECT_ROOT / 'bin'
         bin_folder.mkdir(exist_ok=True)
         
         logger.info(f"Extracting to {bin_folder}")
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(bin_folder)
+            # The first entry seen in each directory is extracted inline so that
+            # directory creation never races; the remaining files are inflated
+            # and written in parallel (zlib and file I/O release the GIL).
+            pending = []
+            seen_dirs = set()
+            for member in zip_ref.infolist():
+                parent = posixpath.dirname(member.filename)
+                if member.is_dir() or parent not in seen_dirs:
+                    seen_dirs.add(parent)
+                    zip_ref.extract(member, bin_folder)
+                else:
+                    pending.append(member)
+            with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+                list(pool.map(lambda member: zip_ref.extract(member, bin_folder), pending))
         
         # Find extracted exe
         exe_path = bin_folder / 'bin' / 'wkhtmltopdf.exe'
@@ -895,6 +1581,8 @@ def install_wkhtmltopdf_portable() -> str:
         
         if exe_path.exists():
             logger.info(f"Portable wkhtmltopdf installed at {exe_path}")
+            # Point later lookups at the new binary
+            WKHTMLTOPDF_PATH = str(exe_path)
             return str(exe_path)
         
         raise Exception("wkhtmltopdf.exe not found after extraction")
@@ -907,8 +1595,85 @@ def install_wkhtmltopdf_portable() -> str:
 # END HELPER FUNCTIONS
 # ============================================================================
 
+# Rendered markdown keyed by a digest of the source text (not the text itself, so
+# large sources are not kept alive): (digest, enable_experimental) -> (html, toc)
+_MARKDOWN_RENDER_CACHE = OrderedDict()
+MARKDOWN_RENDER_CACHE_SIZE = 64
+_markdown_render_lock = threading.Lock()
+
+def render_markdown(md_text: str, enable_experimental: bool = False):
+    """
+    Run the feature pipeline and baseline renderer, returning (html, toc).
+    Identical text (a re-posted preview, a touched but unchanged file) is a cache hit.
+    """
+    key = (hashlib.blake2b(md_text.encode('utf-8'), digest_size=16).digest(), enable_experimental)
+    with _markdown_render_lock:
+        cached = _MARKDOWN_RENDER_CACHE.get(key)
+        if cached is not None:
+            _MARKDOWN_RENDER_CACHE.move_to_end(key)
+            return cached
+    
+    processed = run_pipeline(md_text, PIPELINES[enable_experimental])
+    rendered = render_baseline(processed)
+    
+    with _markdown_render_lock:
+        _MARKDOWN_RENDER_CACHE[key] = rendered
+        if len(_MARKDOWN_RENDER_CACHE) > MARKDOWN_RENDER_CACHE_SIZE:
+            _MARKDOWN_RENDER_CACHE.popitem(last=False)
+    return rendered
+
+# Rendered documents keyed by file version and workspace:
+# (path, mtime_ns, size, workspace, experimental) -> ({listed directory: st_mtime_ns}, (html, toc))
+_DOCUMENT_RENDER_CACHE = OrderedDict()
+DOCUMENT_RENDER_CACHE_SIZE = 64
+_document_render_lock = threading.Lock()
+
 def render_document_from_file(md_file_path: Path, enable_experimental: bool = False) -> str:
-    """Read a document file (markdown or Word), apply feature pipeline, then render HTML."""
+    """
+    Read a document file (markdown or Word), apply feature pipeline, then render HTML.
+    Output is memoized per file version; an entry is reused only while every
+    directory its relative-link check listed (sibling, sub- or parent folders)
+    still has the mtime recorded at render time.
+    """
+    return _document_entry(md_file_path, enable_experimental)[1]
+
+def document_link_signature(md_file_path: Path, enable_experimental: bool = False) -> str:
+    """
+    Digest of the directories the document's link check listed and their mtimes,
+    i.e. everything besides the file itself that its rendered page depends on.
+    """
+    listed_mtimes = _document_entry(md_file_path, enable_experimental)[0]
+    return hashlib.blake2b(repr(sorted(listed_mtimes.items())).encode('utf-8'), digest_size=8).hexdigest()
+
+def _document_entry(md_file_path: Path, enable_experimental: bool):
+    """({listed directory: st_mtime_ns}, (html, toc)) for the current version of a document."""
+    try:
+        stat = md_file_path.stat()
+    except OSError:
+        # Let the uncached path report the error
+        return {}, _render_document(md_file_path, enable_experimental)
+    
+    key = (str(md_file_path), stat.st_mtime_ns, stat.st_size, str(MD_FOLDER), enable_experimental)
+    with _document_render_lock:
+        cached = _DOCUMENT_RENDER_CACHE.get(key)
+    if cached is not None and _directory_mtimes(cached[0]) == cached[0]:
+        with _document_render_lock:
+            if key in _DOCUMENT_RENDER_CACHE:
+                _DOCUMENT_RENDER_CACHE.move_to_end(key)
+        return cached
+    
+    listed_mtimes = {}
+    entry = (listed_mtimes, _render_document(md_file_path, enable_experimental, listed_mtimes))
+    with _document_render_lock:
+        _DOCUMENT_RENDER_CACHE[key] = entry
+        _DOCUMENT_RENDER_CACHE.move_to_end(key)
+        if len(_DOCUMENT_RENDER_CACHE) > DOCUMENT_RENDER_CACHE_SIZE:
+            _DOCUMENT_RENDER_CACHE.popitem(last=False)
+    return entry
+
+def _render_document(md_file_path: Path, enable_experimental: bool = False,
+                     listed_mtimes: dict = None) -> str:
+    """Uncached rendering behind render_document_from_file."""
     try:
         # Check file size before reading
         file_size = md_file_path.stat().st_size
@@ -928,24 +1693,27 @@ def render_document_from_file(md_file_path: Path, enable_experimental: bool = Fa
         
         # Handle Word documents (.docx)
         if md_file_path.suffix.lower() == '.docx':
-            if not WORD_INPUT_AVAILABLE:
+            if optional_import('mammoth', 'Word input') is None:
                 logger.error("Word input attempted but mammoth not available")
                 return "<p>Word document support not available. Please install mammoth library.</p>"
             
             try:
                 html_content = convert_docx_to_html(md_file_path)
                 # Process links in the HTML
-                html_content = process_links_in_html(html_content, base_path=md_file_path.parent)
+                html_content = process_links_in_html(html_content, base_path=md_file_path.parent,
+                                                     listed_mtimes=listed_mtimes)
                 logger.info(f"Successfully rendered Word document: {md_file_path}")
                 return html_content, ""
             except Exception as e:
                 logger.error(f"Failed to render Word document {md_file_path}: {e}", exc_info=True)
                 return f"<p>Error converting Word document: {str(e)}</p>", ""
         
-        # Handle text/markdown files
-        with open(md_file_path, 'r', encoding='utf-8') as f:
-            md_text = f.read()
-            
+        # Handle text/markdown files: one size-hinted read and a single decode
+        md_text = md_file_path.read_bytes().decode('utf-8')
+        if '\r' in md_text:
+            # Same universal-newline translation a text-mode read applies
+            md_text = md_text.replace('\r\n', '\n').replace('\r', '\n')
+        
         logger.info(f"Rendering document: {md_file_path}, size: {len(md_text)} bytes")
         
     except Exception as e:
@@ -953,15 +1721,30 @@ def render_document_from_file(md_file_path: Path, enable_experimental: bool = Fa
         return f"<p>Error reading file: {str(e)}</p>", ""
 
     # Apply markdown processing pipeline
-    pipeline = FEATURES.build_pipeline(enable_experimental=enable_experimental)
-    processed = run_pipeline(md_text, pipeline)
-    html_content, toc_content = render_baseline(processed)
+    html_content, toc_content = render_markdown(md_text, enable_experimental)
     
     # Process links in the rendered HTML
-    html_content = process_links_in_html(html_content, base_path=md_file_path.parent)
+    html_content = process_links_in_html(html_content, base_path=md_file_path.parent,
+                                         listed_mtimes=listed_mtimes)
     
     return html_content, toc_content
 
+def conditional_response(etag: str, render, last_modified: datetime = None):
+    """
+    Revalidation wrapper for GET views: answer 304 from the validators without
+    rendering when the client's copy is current, otherwise call render().
+    Responses carry Cache-Control: no-cache so browsers always revalidate.
+    """
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = make_response('', 304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
 @app.route('/')
 def index():
     """Main page displaying list ofmarkdown files and folders."""
@@ -971,12 +1754,12 @@ def index():
     items = get_markdown_files(subdir=folder, recursive=False)
     
     logger.info(f"Index route (folder='{folder}'): Found {len(items)} items")
-    return render_template('index.html', files=items, md_folder=str(MD_FOLDER), current_folder=folder, version=VERSION)
+    etag = hashlib.md5(repr((VERSION, str(MD_FOLDER), folder, items)).encode('utf-8')).hexdigest()
+    return conditional_response(etag, lambda: render_template('index.html', files=items, md_folder=str(MD_FOLDER), current_folder=folder, version=VERSION))
 
 @app.route('/debug/info')
 def debug_info():
     """Debug endpoint to show configuration and file discovery."""
-    import os
     md_files = get_markdown_files()
     return jsonify({
         'project_root': str(PROJECT_ROOT),
@@ -1013,35 +1796,50 @@ def view_file(filename):
         if potential_path.exists():
             file_path = potential_path
         else:
-            # Search recursively for matching file
-            for f in md_path.rglob('*'):
-                if f.is_file() and (f.stem == filename or f.name == filename or str(f.relative_to(md_path)) == filename):
-                    file_path = f
-                    break
+            # Search recursively for a document with a matching name
+            found = find_document(str(md_path), filename)
+            if found:
+                file_path = Path(found)
     
     if not file_path or not file_path.exists():
         abort(404)
     
-    # Convert to HTML via feature pipeline (baseline + optional experimental)
-    html_content, toc_content = render_document_from_file(file_path, enable_experimental=enable_experimental)
     stat = file_path.stat()
+    # The page depends on the file itself and on which link targets exist, i.e. on
+    # the same directories that validate the render cache entry
+    link_signature = document_link_signature(file_path, enable_experimental)
+    etag = f"{VERSION}-{stat.st_mtime_ns:x}-{stat.st_size:x}-{link_signature}"
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+    
+    def render():
+        # Convert to HTML via feature pipeline (baseline + optional experimental)
+        html_content, toc_content = render_document_from_file(file_path, enable_experimental=enable_experimental)
+        
+        file_info = {
+            'name': file_path.stem,
+            'filename': file_path.name,
+            'relative_path': str(file_path.relative_to(MD_FOLDER)),
+            'content': html_content,
+            'toc': toc_content,
+            'modified': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+            'size': f"{stat.st_size / 1024:.2f} KB"
+        }
+        
+        return render_template('view.html', file=file_info, version=VERSION)
     
-    file_info = {
-        'name': file_path.stem,
-        'filename': file_path.name,
-        'relative_path': str(file_path.relative_to(MD_FOLDER)),
-        'content': html_content,
-        'toc': toc_content,
-        'modified': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-        'size': f"{stat.st_size / 1024:.2f} KB"
-    }
-    
-    return render_template('view.html', file=file_info, version=VERSION)
+    return conditional_response(etag, render, last_modified)
 
 def get_documentation_files():
-    """Get list of available documentation files."""
-    if not DOCS_FOLDER.exists():
+    """Get list of available documentation files (fresh dicts; callers mark the active one)."""
+    try:
+        mtime_ns = DOCS_FOLDER.stat().st_mtime_ns
+    except OSError:
         return []
+    with _LISTING_LOCK:
+        cached = _LISTING_CACHE.get('docs')
+        epoch = _LISTING_EPOCH
+    if cached and cached[0] == mtime_ns:
+        return [dict(doc) for doc in cached[1]]
     
     docs = []
     for f in DOCS_FOLDER.glob('*.md'):
@@ -1053,7 +1851,10 @@ def get_documentation_files():
              })
     # Sort: User Guide first, then alphabetical
     docs.sort(key=lambda x: (x['filename'] != 'USER_GUIDE.md', x['name']))
-    return docs
+    with _LISTING_LOCK:
+        if epoch == _LISTING_EPOCH:
+            _LISTING_CACHE['docs'] = (mtime_ns, docs)
+    return [dict(doc) for doc in docs]
 
 @app.route('/docs')
 @app.route('/docs/<path:filename>')
@@ -1105,7 +1906,7 @@ def preview_file():
         
         # Handle Word documents
         if file_ext == '.docx':
-            if not WORD_INPUT_AVAILABLE:
+            if optional_import('mammoth', 'Word input') is None:
                 return {
                     "error": "Word Document Support Not Available",
                     "message": "The mammoth library is not installed.",
@@ -1146,24 +1947,26 @@ def preview_file():
                     "filename": filename
                 }, 500
         
-        # Handle text/markdown files
-        try:
-            content = file.read().decode('utf-8')
-        except UnicodeDecodeError:
-            return {
-                "error": "Invalid File Encoding",
-                "message": "The file must be encoded in UTF-8.",
-                "details": "Please save your file as UTF-8 and try again."
-            }, 400
+        # Handle text/markdown files: measure the upload from its stream so an
+        # oversized one is rejected before it is read into memory
+        stream = file.stream
+        stream.seek(0, os.SEEK_END)
+        content_size = stream.tell()
+        stream.seek(0)
+        content = None
     else:
         # Fallback: accept content via form POST (legacy support)
         content = request.form.get('content', '')
         filename = request.form.get('filename', 'Untitled.md')
         if not content:
             abort(400, description="No content provided")
+        # UTF-8 needs at most 4 bytes per character, so short text skips the encode
+        if len(content) * 4 <= MAX_FILE_SIZE:
+            content_size = 0
+        else:
+            content_size = len(content.encode('utf-8'))
     
     # Check actual content size
-    content_size = len(content.encode('utf-8'))
     if content_size > MAX_FILE_SIZE:
         size_mb = content_size / (1024 * 1024)
         max_mb = MAX_FILE_SIZE / (1024 * 1024)
@@ -1176,13 +1979,21 @@ def preview_file():
             "max_mb": f"{max_mb:.0f}"
         }, 413
     
+    if content is None:
+        try:
+            content = file.read().decode('utf-8')
+        except UnicodeDecodeError:
+            return {
+                "error": "Invalid File Encoding",
+                "message": "The file must be encoded in UTF-8.",
+                "details": "Please save your file as UTF-8 and try again."
+            }, 400
+    
     # Smart features disabled - using baseline rendering only
     enable_experimental = False
     
     # Use same feature pipeline as file view
-    pipeline = FEATURES.build_pipeline(enable_experimental=enable_experimental)
-    processed = run_pipeline(content, pipeline)
-    html_content, toc_content = render_baseline(processed)
+    html_content, toc_content = render_markdown(content, enable_experimental)
     html_content = process_links_in_html(html_content, base_path=MD_FOLDER, is_preview=True)
     
     file_info = {
@@ -1197,17 +2008,35 @@ def preview_file():
     
     return render_template('view.html', file=file_info, version=VERSION)
 
+# PDF options for high quality output
+PDF_OPTIONS = {
+    'page-size': 'A4',
+    'margin-top': '20mm',
+    'margin-right': '20mm',
+    'margin-bottom': '20mm',
+    'margin-left': '20mm',
+    'encoding': 'UTF-8',
+    'no-outline': None,
+    'enable-local-file-access': None,
+    'print-media-type': None,
+    'dpi': 300,
+    'image-quality': 100,
+}
+
 @app.route('/export-pdf', methods=['POST'])
 def export_pdf():
     """Export the current document view to PDF using pdfkit/wkhtmltopdf."""
-    if not PDF_EXPORT_AVAILABLE:
+    pdfkit = optional_import('pdfkit', 'PDF export')
+    if pdfkit is None:
         return jsonify({
             "error": "PDF export is not available. Please install pdfkit library.",
             "install_guide": "pip install pdfkit"
         }), 503
     
     try:
-        data = request.get_json()
+        # Parse without caching the raw body, so only the decoded HTML is held
+        # while wkhtmltopdf runs (pdfkit pipes it to the binary's stdin)
+        data = request.get_json(cache=False)
         html_content = data.get('html', '')
         filename = data.get('filename', 'document.pdf')
         
@@ -1234,32 +2063,26 @@ def export_pdf():
                 'install_options': ['portable']
             }), 404
         
-        # Configure pdfkit with found path
-        config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path)
-        
-        # PDF options for high quality output
-        options = {
-            'page-size': 'A4',
-            'margin-top': '20mm',
-            'margin-right': '20mm',
-            'margin-bottom': '20mm',
-            'margin-left': '20mm',
-            'encoding': 'UTF-8',
-            'no-outline': None,
-            'enable-local-file-access': None,
-            'print-media-type': None,
-            'dpi': 300,
-            'image-quality': 100,
-        }
-        
+        # wkhtmltopdf writes the PDF to a temporary file which is streamed from
+        # disk, rather than holding the whole document in memory for the response
+        fd, pdf_path = tempfile.mkstemp(prefix='docnexus-', suffix='.pdf')
+        os.close(fd)
+        pdf_file = Path(pdf_path)
         try:
+            # Configure pdfkit with found path
+            config = pdfkit_configuration(wkhtmltopdf_path)
             # Generate PDF from HTML string
-            pdf_bytes = pdfkit.from_string(html_content, False, options=options, configuration=config)
-            logger.info(f"PDF generated successfully: {len(pdf_bytes)} bytes")
+            pdfkit.from_string(html_content, pdf_path, options=PDF_OPTIONS, configuration=config)
+            pdf_size = pdf_file.stat().st_size
+            logger.info(f"PDF generated successfully: {pdf_size} bytes")
+            pdf_stream = TemporaryDownload(pdf_path)
         except OSError as e:
+            pdf_file.unlink(missing_ok=True)
             # wkhtmltopdf execution failed
             if 'No wkhtmltopdf executable found' in str(e) or 'wkhtmltopdf' in str(e).lower():
                 logger.error(f"wkhtmltopdf execution failed: {e}")
+                # Forget the cached location so a moved or reinstalled binary is found again
+                forget_wkhtmltopdf()
                 return jsonify({
                     'error': 'wkhtmltopdf_not_found',
                     'message': 'wkhtmltopdf could not be executed.',
@@ -1267,43 +2090,283 @@ def export_pdf():
                     'details': str(e)
                 }), 404
             raise
+        except BaseException:
+            pdf_file.unlink(missing_ok=True)
+            raise
         
-        # Create response with PDF
-        response = make_response(pdf_bytes)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
+        response = send_file(pdf_stream, mimetype='application/pdf', as_attachment=True, download_name=filename)
+        response.content_length = pdf_size
         return response
         
     except Exception as e:
-        print(f"Error generating PDF: {e}")
-        import traceback
-        traceback.print_exc()
-        abort(500, description=f"Failed to generate PDF: {str(e)}")
+        logger.exception("Error generating PDF")
         abort(500, description=f"Failed to generate PDF: {str(e)}")
 
-def add_bookmark(paragraph, bookmark_name):
-    """Add a bookmark to a paragraph in a Word document."""
-    from docx.oxml import OxmlElement
-    from docx.oxml.ns import qn
+@lru_cache(maxsize=None)
+def word_html_converter():
+    """HtmlToDocx subclass used by Word export, defined once htmldocx is importable."""
+    htmldocx = optional_import('htmldocx', 'Word export')
+    
+    class WordHtmlConverter(htmldocx.HtmlToDocx):
+        def run_process(self, html):
+            """
+            htmldocx's run_process without the str(soup) round trip: the markup fed
+            here is already BeautifulSoup output, so it is handed to the parser as is.
+            The soup is only needed to locate tables, so markup without one is not
+            parsed into a soup at all (table cells mostly).
+            """
+            if self.bs and '<table' in html:
+                self.soup = htmldocx.h2d.BeautifulSoup(html, 'html.parser')
+            if self.include_tables:
+                self.get_tables()
+            self.feed(html)
+
+        def handle_table(self):
+            """
+            htmldocx's handle_table, filling cells from one snapshot of the new table's
+            cells. Table.cell() rebuilds the whole cell grid on every call, which made
+            filling a table quadratic in its size.
+            """
+            table_soup = self.tables[self.table_no]
+            rows, cols = self.get_table_dimensions(table_soup)
+            self.table = self.doc.add_table(rows, cols)
+            
+            if self.table_style:
+                try:
+                    self.table.style = self.table_style
+                except KeyError as e:
+                    raise ValueError(f"Unable to apply style {self.table_style}.") from e
+            
+            # Same row-major indexing as Table.cell(row, col) on a freshly created table
+            cells = self.table._cells
+            cell_row = 0
+            for row in self.get_table_rows(table_soup):
+                cell_col = 0
+                for col in self.get_table_columns(row):
+                    cell_html = self.get_cell_html(col)
+                    if col.name == 'th':
+                        cell_html = "<b>%s</b>" % cell_html
+                    child_parser = WordHtmlConverter()
+                    child_parser.copy_settings_from(self)
+                    child_parser.add_html_to_cell(cell_html, cells[cell_row * cols + cell_col])
+                    cell_col += 1
+                cell_row += 1
+            
+            # skip all tags until corresponding closing tag
+            self.instances_to_skip = len(table_soup.find_all('table'))
+            self.skip_tag = 'table'
+            self.skip = True
+            self.table = None
+    
+    return WordHtmlConverter
+
+def add_bookmark(paragraph, bookmark_name, bookmark_id):
+    """Add a bookmark to a paragraph in a Word document; bookmark_id must be unique in the document."""
+    docx = docx_api()
+    bookmark_id = str(bookmark_id)
     
     # Create bookmark start element
-    bookmark_start = OxmlElement('w:bookmarkStart')
-    bookmark_start.set(qn('w:id'), str(hash(bookmark_name) % 10000))  # Generate unique ID
-    bookmark_start.set(qn('w:name'), bookmark_name)
+    bookmark_start = copy.copy(docx.bookmark_start)
+    bookmark_start.set(docx.W_ID, bookmark_id)
+    bookmark_start.set(docx.W_NAME, bookmark_name)
     
     # Create bookmark end element
-    bookmark_end = OxmlElement('w:bookmarkEnd')
-    bookmark_end.set(qn('w:id'), str(hash(bookmark_name) % 10000))
+    bookmark_end = copy.copy(docx.bookmark_end)
+    bookmark_end.set(docx.W_ID, bookmark_id)
     
     # Insert bookmark around the paragraph content
     paragraph._element.insert(0, bookmark_start)
     paragraph._element.append(bookmark_end)
 
+# Inline styles that make exported Word content match the rendered page
+WORD_TABLE_STYLE = 'border-collapse: collapse; width: 100%; border: 2px solid rgba(99, 102, 241, 0.2); margin-bottom: 20px;'
+# Word doesn't support gradients, so table headers use solid purple
+WORD_TH_STYLE = 'background-color: #6366f1 !important; color: #ffffff !important; padding: 14px 18px; font-weight: 700; text-align: left; border: 1px solid rgba(99, 102, 241, 0.2); font-size: 13px; text-transform: uppercase; letter-spacing: 0.5px;'
+WORD_TD_STYLE = 'padding: 14px 18px; text-align: left; border: 1px solid var(--color-border-default); background-color: #ffffff;'
+WORD_INLINE_CODE_STYLE = 'background-color: #faf5ff; color: #8b5cf6; padding: 2px 6px; border-radius: 4px; font-family: Consolas, Courier New, monospace; font-size: 0.9em; border: 1px solid #e9d5ff;'
+# Elements styled unconditionally, by tag name
+WORD_TAG_STYLES = {
+    # Headings with STRONG colors to match rendered version
+    'h1': 'color: #6366f1 !important; font-size: 32px; font-weight: 800; margin-top: 24px; margin-bottom: 16px; border-bottom: 3px solid #6366f1; padding-bottom: 8px;',
+    'h2': 'color: #8b5cf6 !important; font-size: 24px; font-weight: 700; margin-top: 20px; margin-bottom: 14px; border-bottom: 2px solid #c4b5fd; padding-bottom: 6px;',
+    'h3': 'color: #a855f7 !important; font-size: 20px; font-weight: 600; margin-top: 18px; margin-bottom: 12px;',
+    'h4': 'color: #c084fc !important; font-size: 18px; font-weight: 600; margin-top: 16px; margin-bottom: 10px;',
+    'h5': 'color: #d8b4fe !important; font-size: 16px; font-weight: 600; margin-top: 14px; margin-bottom: 8px;',
+    'h6': 'color: #e9d5ff !important; font-size: 14px; font-weight: 600; margin-top: 12px; margin-bottom: 6px;',
+    # Code blocks
+    'pre': 'background-color: #f5f5f4; padding: 16px; border-radius: 8px; border: 2px solid #e7e5e4; font-family: Consolas, Courier New, monospace; overflow-x: auto; margin: 12px 0;',
+    'blockquote': 'border-left: 4px solid #6366f1; padding: 16px; margin: 16px 0; background-color: #f5f3ff; color: #44403c;',
+}
+# Markup serialized by BeautifulSoup: comments, CDATA and declarations first (their
+# text is never styled), then tags as (end slash, name, attributes, self-closing slash).
+# Attribute values are always quoted and escape '<' and '>'.
+WORD_MARKUP_RE = re.compile(
+    r'<!--.*?-->|<!\[CDATA\[.*?\]\]>|<[!?][^>]*>'
+    r'|<(/?)([a-zA-Z][^\s/>]*)((?:\s+[^\s=/>]+(?:="[^"]*"|=\'[^\']*\')?)*)\s*(/?)>',
+    re.S
+)
+WORD_ATTR_RE = re.compile(r'\s+([^\s=/>]+)(?:="([^"]*)"|=\'([^\']*)\')?')
+WORD_HEADING_TAGS = frozenset({'h1', 'h2', 'h3', 'h4', 'h5', 'h6'})
+
+def _set_word_attrs(attr_text, updates):
+    """Set (name, value) pairs on a serialized attribute list, keeping BeautifulSoup's sorted order."""
+    attrs = {m.group(1): m.group(0) for m in WORD_ATTR_RE.finditer(attr_text)}
+    for name, value in updates:
+        attrs[name] = f' {name}="{value}"'
+    return ''.join(attrs[name] for name in sorted(attrs))
+
+def _word_attr_value(attr_text, attr_name):
+    """Unescaped value of one attribute in a serialized attribute list, or None."""
+    for m in WORD_ATTR_RE.finditer(attr_text):
+        if m.group(1) == attr_name:
+            value = m.group(2) if m.group(2) is not None else m.group(3)
+            return html_module.unescape(value or '')
+    return None
+
+def style_markup_for_word(markup: str):
+    """
+    Add the inline Word styles to every element below the root of serialized markup.
+    Works on the string in one regex pass, tracking open elements so cells are only
+    styled inside a table below the root and code outside <pre>.
+    Returns (styled markup, {heading text: heading id}), the text joined from the
+    heading's stripped strings like get_text(strip=True).
+    """
+    open_tags = []
+    table_depth = 0
+    parts = []
+    last = 0
+    # Open headings as [depth, start, id, text parts]; closed ones as (start, text, id)
+    open_headings = []
+    headings = []
+    text_start = 0
+    for m in WORD_MARKUP_RE.finditer(markup):
+        if open_headings and m.start() > text_start:
+            text = html_module.unescape(markup[text_start:m.start()]).strip()
+            if text:
+                for heading in open_headings:
+                    heading[3].append(text)
+        text_start = m.end()
+        
+        name = m.group(2)
+        if name is None:
+            continue
+        if m.group(1):
+            if open_tags and open_tags[-1] == name:
+                open_tags.pop()
+                if name == 'table' and open_tags:
+                    table_depth -= 1
+                if open_headings and open_headings[-1][0] == len(open_tags):
+                    _, start, heading_id, text_parts = open_headings.pop()
+                    headings.append((start, ''.join(text_parts), heading_id))
+            continue
+        
+        updates = None
+        if open_tags:
+            style = WORD_TAG_STYLES.get(name)
+            if style is not None:
+                updates = (('style', style),)
+            # Style tables with MORE EXPLICIT colors for Word
+            elif name == 'table':
+                updates = (('style', WORD_TABLE_STYLE), ('border', '1'), ('cellpadding', '0'), ('cellspacing', '0'))
+            # Style table headers (multiple methods for maximum compatibility)
+            elif name == 'th':
+                if table_depth:
+                    updates = (('bgcolor', '#6366f1'), ('style', WORD_TH_STYLE))
+            # Style table cells with borders and proper padding
+            elif name == 'td':
+                if table_depth:
+                    updates = (('style', WORD_TD_STYLE),)
+            # Style inline code
+            elif name == 'code':
+                if open_tags[-1] != 'pre':
+                    updates = (('style', WORD_INLINE_CODE_STYLE),)
+        if updates:
+            parts.append(markup[last:m.start(3)])
+            parts.append(_set_word_attrs(m.group(3), updates))
+            last = m.end(3)
+        
+        if not m.group(4):
+            if open_tags:
+                if name == 'table':
+                    table_depth += 1
+                elif name in WORD_HEADING_TAGS:
+                    open_headings.append([len(open_tags), m.start(), _word_attr_value(m.group(3), 'id'), []])
+            open_tags.append(name)
+    parts.append(markup[last:])
+    
+    # Later headings win for duplicate text, in document order
+    heading_ids = {}
+    for _, text, heading_id in sorted(headings):
+        if heading_id and text:
+            heading_ids[text] = heading_id
+    return ''.join(parts), heading_ids
+
+def prepare_html_for_word(html_content: str):
+    """
+    Strip an exported page down to its document content and inline the rendered
+    styles htmldocx needs. The page is walked once to find script/style/nav
+    elements; styling is applied to the serialized content area.
+    Returns (clean_html, {heading text: heading id}) for bookmark creation.
+    """
+    # Use lxml parser for better performance on large documents (html.parser otherwise)
+    BeautifulSoup = optional_import('bs4', 'Word export').BeautifulSoup
+    soup = BeautifulSoup(html_content, html_parser_name())
+    
+    logger.debug("Cleaning HTML content")
+    
+    # Remove script tags, style tags (inline styles in elements will be preserved)
+    # and navigation elements, in that order
+    removed = {'script': [], 'style': [], 'nav': []}
+    for tag in soup.find_all(list(removed)):
+        removed[tag.name].append(tag)
+    for tags in removed.values():
+        for tag in tags:
+            tag.decompose()
+    
+    # Remove head tag content (but keep the structure for parsing)
+    if soup.head:
+        # Keep only meta charset for proper encoding
+        for tag in soup.head.find_all():
+            if tag.name != 'meta' or tag.get('charset') is None:
+                tag.decompose()
+    
+    logger.debug("Extracting main content")
+    
+    # Extract only the main content area (markdown-content div)
+    main_content = soup.find(class_='markdown-content')
+    if not main_content:
+        # Fallback: use body content if markdown-content not found
+        if soup.body:
+            return f'<html><body>{soup.body.decode_contents()}</body></html>', {}
+        return str(soup), {}
+    
+    # Keep heading IDs for bookmark creation later, but don't add HTML anchors
+    # (htmldocx doesn't process them correctly)
+    
+    # Tables without a thead get one when their first row holds header cells.
+    # Don't apply alternating row colors in HTML - will handle in Word post-processing
+    # to ensure proper cell-by-cell styling
+    for table in main_content.find_all('table'):
+        if not table.find('thead'):
+            first_row = table.find('tr')
+            if first_row and first_row.find('th'):
+                thead = soup.new_tag('thead')
+                first_row.extract()
+                thead.append(first_row)
+                table.insert(0, thead)
+    
+    # Add inline styles to match rendered version on the serialized content,
+    # collecting heading IDs in the same pass
+    content, heading_ids = style_markup_for_word(str(main_content))
+    
+    # Create a clean HTML structure with just the content
+    return f'<html><head><meta charset="utf-8"></head><body>{content}</body></html>', heading_ids
+
 @app.route('/export-word', methods=['POST'])
 def export_word():
     """Export the current document view to Word (.docx) format maintaining exact formatting."""
-    if not WORD_EXPORT_AVAILABLE:
+    htmldocx = optional_import('htmldocx', 'Word export')
+    if htmldocx is None:
         return {
             "error": "Word export is not available. Please install htmldocx.",
             "install_guide": "pip install htmldocx"
@@ -1311,7 +2374,7 @@ def export_word():
     
     try:
         # Increase timeout handling for large documents
-        data = request.get_json()
+        data = request.get_json(cache=False)  # don't keep the raw body alongside the parsed HTML
         html_content = data.get('html', '')
         filename = data.get('filename', 'document.docx')
         
@@ -1331,140 +2394,28 @@ def export_word():
             }, 413
         
         content_size_mb = html_size / (1024 * 1024)
-        print(f"Processing Word export: {filename} ({content_size_mb:.2f} MB)")
+        logger.info("Processing Word export: %s (%.2f MB)", filename, content_size_mb)
         
         if content_size_mb > 30:
-            print(f"Warning: Large document detected ({content_size_mb:.2f} MB). Processing may take longer...")
+            logger.warning("Large document detected (%.2f MB). Processing may take longer", content_size_mb)
         
         # Ensure filename has .docx extension
         if not filename.endswith('.docx'):
             filename = filename.rsplit('.', 1)[0] + '.docx' if '.' in filename else filename + '.docx'
         
         # Clean HTML content - remove script tags, style tags in head, and other non-document elements
-        # Parse HTML and extract only the document content
-        # Use lxml parser for better performance on large documents
-        from bs4 import BeautifulSoup
-        
-        try:
-            soup = BeautifulSoup(html_content, 'lxml')
-        except:
-            # Fallback to html.parser if lxml not available
-            soup = BeautifulSoup(html_content, 'html.parser')
-        
-        print("Cleaning HTML content...")
-        
-        # Remove all script tags
-        for script in soup.find_all('script'):
-            script.decompose()
-        
-        # Remove style tags (inline styles in elements will be preserved)
-        for style in soup.find_all('style'):
-            style.decompose()
-        
-        # Remove navigation elements
-        for nav in soup.find_all('nav'):
-            nav.decompose()
-        
-        # Remove head tag content (but keep the structure for parsing)
-        if soup.head:
-            # Keep only meta charset for proper encoding
-            for tag in soup.head.find_all():
-                if tag.name != 'meta' or tag.get('charset') is None:
-                    tag.decompose()
-        
-        print("Extracting main content...")
-        
-        # Extract only the main content area (markdown-content div)
-        main_content = soup.find(class_='markdown-content')
-        if main_content:
-            # Keep heading IDs for bookmark creation later, but don't add HTML anchors
-            # (htmldocx doesn't process them correctly)
-            
-            # Add inline styles to match rendered version
-            # Style tables with MORE EXPLICIT colors for Word
-            for table in main_content.find_all('table'):
-                # Set table-level styling
-                table['style'] = 'border-collapse: collapse; width: 100%; border: 2px solid rgba(99, 102, 241, 0.2); margin-bottom: 20px;'
-                table['border'] = '1'
-                table['cellpadding'] = '0'
-                table['cellspacing'] = '0'
-                
-                # Find or create thead
-                thead = table.find('thead')
-                if not thead:
-                    # If no thead, check if first row should be header
-                    first_row = table.find('tr')
-                    if first_row and first_row.find('th'):
-                        thead = soup.new_tag('thead')
-                        first_row.extract()
-                        thead.append(first_row)
-                        table.insert(0, thead)
-                
-                # Style table headers - Word doesn't support gradients, use solid purple
-                for th in table.find_all('th'):
-                    # Use multiple methods for maximum compatibility
-                    th['bgcolor'] = '#6366f1'
-                    th['style'] = 'background-color: #6366f1 !important; color: #ffffff !important; padding: 14px 18px; font-weight: 700; text-align: left; border: 1px solid rgba(99, 102, 241, 0.2); font-size: 13px; text-transform: uppercase; letter-spacing: 0.5px;'
-                
-                # Style table cells with borders and proper padding
-                for td in table.find_all('td'):
-                    td['style'] = 'padding: 14px 18px; text-align: left; border: 1px solid var(--color-border-default); background-color: #ffffff;'
-                
-                # Don't apply alternating row colors in HTML - will handle in Word post-processing
-                # to ensure proper cell-by-cell styling
-            
-            # Style headings with STRONG colors to match rendered version
-            for h1 in main_content.find_all('h1'):
-                h1['style'] = 'color: #6366f1 !important; font-size: 32px; font-weight: 800; margin-top: 24px; margin-bottom: 16px; border-bottom: 3px solid #6366f1; padding-bottom: 8px;'
-            
-            for h2 in main_content.find_all('h2'):
-                h2['style'] = 'color: #8b5cf6 !important; font-size: 24px; font-weight: 700; margin-top: 20px; margin-bottom: 14px; border-bottom: 2px solid #c4b5fd; padding-bottom: 6px;'
-            
-            for h3 in main_content.find_all('h3'):
-                h3['style'] = 'color: #a855f7 !important; font-size: 20px; font-weight: 600; margin-top: 18px; margin-bottom: 12px;'
-            
-            for h4 in main_content.find_all('h4'):
-                h4['style'] = 'color: #c084fc !important; font-size: 18px; font-weight: 600; margin-top: 16px; margin-bottom: 10px;'
-            
-            for h5 in main_content.find_all('h5'):
-                h5['style'] = 'color: #d8b4fe !important; font-size: 16px; font-weight: 600; margin-top: 14px; margin-bottom: 8px;'
-            
-            for h6 in main_content.find_all('h6'):
-                h6['style'] = 'color: #e9d5ff !important; font-size: 14px; font-weight: 600; margin-top: 12px; margin-bottom: 6px;'
-            
-            # Style code blocks
-            for pre in main_content.find_all('pre'):
-                pre['style'] = 'background-color: #f5f5f4; padding: 16px; border-radius: 8px; border: 2px solid #e7e5e4; font-family: Consolas, Courier New, monospace; overflow-x: auto; margin: 12px 0;'
-            
-            # Style inline code
-            for code in main_content.find_all('code'):
-                if not code.parent or code.parent.name != 'pre':
-                    code['style'] = 'background-color: #faf5ff; color: #8b5cf6; padding: 2px 6px; border-radius: 4px; font-family: Consolas, Courier New, monospace; font-size: 0.9em; border: 1px solid #e9d5ff;'
-            
-            # Style blockquotes
-            for blockquote in main_content.find_all('blockquote'):
-                blockquote['style'] = 'border-left: 4px solid #6366f1; padding: 16px; margin: 16px 0; background-color: #f5f3ff; color: #44403c;'
-            
-            # Create a clean HTML structure with just the content
-            clean_html = f'<html><head><meta charset="utf-8"></head><body>{str(main_content)}</body></html>'
-        else:
-            # Fallback: use body content if markdown-content not found
-            if soup.body:
-                clean_html = f'<html><body>{soup.body.decode_contents()}</body></html>'
-            else:
-                clean_html = str(soup)
+        # and extract only the document content with Word-friendly inline styles
+        clean_html, heading_ids = prepare_html_for_word(html_content)
         
         # Create a new Word document
-        print("Creating Word document...")
-        from docx import Document
-        from docx.shared import RGBColor, Pt
-        from docx.oxml import OxmlElement
-        from docx.oxml.ns import qn
-        doc = Document()
+        logger.debug("Creating Word document")
+        docx = docx_api()
+        doc = docx.Document()
         
         # Initialize the HTML to DOCX converter
-        print("Converting HTML to Word...")
-        new_parser = HtmlToDocx()
+        logger.debug("Converting HTML to Word")
+        # A fresh converter per export: it is an HTMLParser holding per-document state
+        new_parser = word_html_converter()()
         
         # Parse and add cleaned HTML content to the document
         # The htmldocx library maintains most HTML styling including:
@@ -1480,100 +2431,88 @@ def export_word():
         # We need to add these manually after conversion
         new_parser.add_html_to_document(clean_html, doc)
         
-        print("Post-processing document...")
+        logger.debug("Post-processing document")
         # ==== POST-PROCESSING: Add bookmarks and fix internal hyperlinks ====
         # htmldocx library doesn't support internal document bookmarks/anchors
         # We need to manually add bookmarks to headings and fix TOC links
         
-        # Step 1: Find all heading IDs from the original HTML
-        heading_ids = {}
-        for heading in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-            heading_id = heading.get('id')
-            heading_text = heading.get_text(strip=True)
-            if heading_id and heading_text:
-                heading_ids[heading_text] = heading_id
+        # Step 1: Heading IDs from the original HTML were collected by prepare_html_for_word
         
-        # Step 2: Add bookmarks to headings in the Word document
+        # Step 2: Add bookmarks to headings in the Word document, numbered from 1
+        # (ids derived from hash(name) % 10000 collided and were salted per process)
+        bookmark_ids = itertools.count(1)
         for paragraph in doc.paragraphs:
-            # Check if this paragraph is a heading with matching text
-            if paragraph.style.name.startswith('Heading') or paragraph.text in heading_ids:
-                heading_text = paragraph.text.strip()
-                if heading_text in heading_ids:
-                    bookmark_name = heading_ids[heading_text]
-                    # Add bookmark to this paragraph
-                    add_bookmark(paragraph, bookmark_name)
+            # Check if this paragraph is a heading with matching text (the text test
+            # first, so the style is only looked up for candidate paragraphs)
+            text = paragraph.text
+            heading_text = text.strip()
+            if heading_text in heading_ids and (text in heading_ids or paragraph.style.name.startswith('Heading')):
+                bookmark_name = heading_ids[heading_text]
+                # Add bookmark to this paragraph
+                add_bookmark(paragraph, bookmark_name, next(bookmark_ids))
         
         # Step 3: Fix internal hyperlinks in the document
-        # Find all hyperlinks and convert TOC links from external to internal bookmarks
-        for paragraph in doc.paragraphs:
-            for hyperlink in paragraph._element.findall('.//w:hyperlink', 
-                                                        namespaces={'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
-                                                                   'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'}):
-                # Get the relationship ID
-                r_id = hyperlink.get(qn('r:id'))
-                if r_id:
-                    # Get the target from the relationship
-                    try:
-                        rel = paragraph.part.rels[r_id]
-                        target_url = rel.target_ref
-                        
-                        # Check if this is an internal anchor link (starts with #)
-                        if target_url and target_url.startswith('#'):
-                            bookmark_name = target_url[1:]  # Remove the #
-                            
-                            # Remove the external relationship
-                            del paragraph.part.rels[r_id]
-                            
-                            # Convert to internal bookmark link
-                            hyperlink.set(qn('w:anchor'), bookmark_name)
-                            # Remove the r:id attribute since it's now an internal link
-                            if qn('r:id') in hyperlink.attrib:
-                                del hyperlink.attrib[qn('r:id')]
-                    except (KeyError, AttributeError):
-                        pass  # Skip if relationship not found
+        # Find all hyperlinks in body paragraphs (one XPath query over the body) and
+        # convert TOC links from external to internal bookmarks
+        rels = doc.part.rels
+        for hyperlink in doc.element.body.xpath('./w:p//w:hyperlink[@r:id]'):
+            # Get the relationship ID
+            r_id = hyperlink.get(docx.R_ID)
+            # Get the target from the relationship
+            try:
+                target_url = rels[r_id].target_ref
+                
+                # Check if this is an internal anchor link (starts with #)
+                if target_url and target_url.startswith('#'):
+                    bookmark_name = target_url[1:]  # Remove the #
+                    
+                    # Remove the external relationship
+                    del rels[r_id]
+                    
+                    # Convert to internal bookmark link
+                    hyperlink.set(docx.W_ANCHOR, bookmark_name)
+                    # Remove the r:id attribute since it's now an internal link
+                    del hyperlink.attrib[docx.R_ID]
+            except (KeyError, AttributeError):
+                pass  # Skip if relationship not found
         
         # Step 4: Post-process tables in Word document
         # Apply proper formatting that htmldocx might not handle correctly
-        from docx.shared import RGBColor, Pt
-        from docx.enum.text import WD_ALIGN_PARAGRAPH
-        
+        row_shading = docx.OxmlElement('w:shd')
+        row_shading.set(docx.W_FILL, 'f9fafb')  # Light gray
         for table in doc.tables:
             # Style table borders
             table.style = 'Table Grid'
             
-            # Process header row (first row)
-            if len(table.rows) > 0:
-                header_row = table.rows[0]
-                for cell in header_row.cells:
-                    # Set header cell background to purple
-                    shading_elm = OxmlElement('w:shd')
-                    shading_elm.set(qn('w:fill'), '6366f1')  # Purple background
-                    cell._element.get_or_add_tcPr().append(shading_elm)
-                    
-                    # Format text: white color, bold, uppercase
-                    for paragraph in cell.paragraphs:
-                        for run in paragraph.runs:
-                            run.font.color.rgb = RGBColor(255, 255, 255)  # White text
-                            run.font.bold = True
-                            run.font.size = Pt(11)
-                        paragraph.alignment = WD_ALIGN_PARAGRAPH.LEFT
+            # Process header row (first row), working on the cell XML directly
+            for tc in table._tbl.xpath('./w:tr[1]/w:tc'):
+                # Set header cell background to purple
+                shading_elm = docx.OxmlElement('w:shd')
+                shading_elm.set(docx.W_FILL, '6366f1')  # Purple background
+                tc.get_or_add_tcPr().append(shading_elm)
+                
+                # Format text: white color, bold, uppercase
+                for p in tc.xpath('./w:p'):
+                    for r in p.xpath('./w:r'):
+                        rPr = r.get_or_add_rPr()
+                        rPr.remove_all('w:color')
+                        rPr.get_or_add_color().val = docx.RGBColor(255, 255, 255)  # White text
+                        rPr.b_val = True
+                        rPr.sz_val = docx.Pt(11)
+                    p.get_or_add_pPr().jc_val = docx.WD_ALIGN_PARAGRAPH.LEFT
             
-            # Apply alternating row colors for data rows (skip header)
-            for idx, row in enumerate(table.rows[1:], start=1):
-                for cell in row.cells:
-                    # Every other row gets a light background
-                    if idx % 2 == 0:
-                        shading_elm = OxmlElement('w:shd')
-                        shading_elm.set(qn('w:fill'), 'f9fafb')  # Light gray
-                        cell._element.get_or_add_tcPr().append(shading_elm)
+            # Apply alternating row colors for data rows (skip header): every other
+            # data row, i.e. rows 3, 5, ... gets a light background
+            for tc in table._tbl.xpath('./w:tr[position() > 1 and position() mod 2 = 1]/w:tc'):
+                tc.get_or_add_tcPr().append(copy.copy(row_shading))
         
         # Save to BytesIO buffer
-        print("Saving document...")
+        logger.debug("Saving document")
         buffer = io.BytesIO()
         doc.save(buffer)
         buffer.seek(0)
         
-        print(f"Word export complete: {filename}")
+        logger.info("Word export complete: %s", filename)
         
         # Create response with Word document
         response = make_response(buffer.getvalue())
@@ -1583,9 +2522,7 @@ def export_word():
         return response
         
     except Exception as e:
-        print(f"Error generating Word document: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error generating Word document")
         abort(500, description=f"Failed to generate Word document: {str(e)}")
 
 @app.route('/search')
@@ -1596,59 +2533,226 @@ def search():
     if not query:
         return {'results': []}
     
+    if len(query) < MIN_QUERY_LEN:
+        return {'results': [], 'query': query, 'count': 0}
+    
+    # Results are paged (page is 1-based); only as many files are scanned as the
+    # requested page needs, plus one result to tell whether another page follows.
+    # Later pages continue the scan where earlier ones stopped. Multi-word queries
+    # are ranked, so their first page scans every candidate document.
+    try:
+        page = int(request.args.get('page', 1))
+        limit = int(request.args.get('limit', MAX_RESULTS))
+    except ValueError:
+        return jsonify({'error': 'page and limit must be integers'}), 400
+    # Out-of-range values are clamped; the response reports the ones used
+    page = max(page, 1)
+    limit = min(max(limit, 1), MAX_RESULTS)
+    offset = (page - 1) * limit
+    
     query_lower = query.lower()
-    results = []
-    md_files = get_markdown_files()
+    results = search_results(query_lower, sync_search_index(get_markdown_files())).fetch(offset + limit + 1)
+    page_results = list(results[offset:offset + limit])
+    return {'results': page_results, 'query': query, 'count': len(page_results),
+            'page': page, 'limit': limit, 'has_more': len(results) > offset + limit}
+
+# /search: shortest query searched, and most results returned per page
+MIN_QUERY_LEN = 2
+MAX_RESULTS = 50
+
+# Threads reading /search content candidates (file reads release the GIL)
+SEARCH_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix='search')
+# Content scans submitted ahead of the results being collected
+SEARCH_READ_AHEAD = 16
+
+def find_match_context(data: bytes, query_lower: str):
+    """
+    (line number, snippet) for the first line of a UTF-8 document containing
+    query_lower case-insensitively, or None. The snippet is that line with its
+    neighbours, cut to 150 characters. ASCII documents (most markdown) are searched
+    as bytes, so only the snippet lines are ever decoded; others are decoded and
+    lowercased once.
+    Raises UnicodeDecodeError if the document is not valid UTF-8.
+    """
+    # Same line breaks as reading in text mode (universal newlines)
+    if b'\r' in data:
+        data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    
+    if data.isascii():
+        if not query_lower.isascii():
+            return None
+        text, newline = data, b'\n'
+        idx = data.translate(ASCII_LOWER).find(query_lower.encode('ascii'))
+    else:
+        text, newline = data.decode('utf-8'), '\n'
+        # Lowercase once; the first match is on the first line containing the query
+        text_lower = text.lower()
+        idx = text_lower.find(query_lower)
+        if idx >= 0 and len(text_lower) != len(text):
+            # Some characters lowercase to several, so offsets into text_lower
+            # don't apply to text: use the start of the same line instead
+            target_line = text_lower.count('\n', 0, idx)
+            idx = 0
+            for _ in range(target_line):
+                idx = text.index('\n', idx) + 1
+    # A query spanning lines never matches a single line
+    if idx < 0 or '\n' in query_lower:
+        return None
     
-    for file_info in md_files:
-        # Search in filename
-        if query_lower in file_info['name'].lower() or query_lower in file_info['filename'].lower():
-            results.append({
-                'name': file_info['name'],
-                'filename': file_info['filename'],
-                'path': file_info['relative_path'],
-                'folder': file_info['folder'],
-                'match_type': 'filename',
-                'snippet': f"Found in filename: {file_info['filename']}"
-            })
-            continue
-        
-        # Search in file content
-        try:
-            with open(file_info['path'], 'r', encoding='utf-8') as f:
-                content = f.read()
-                if query_lower in content.lower():
-                    # Find context snippet
-                    lines = content.split('\n')
-                    for i, line in enumerate(lines):
-                        if query_lower in line.lower():
-                            # Get context (line before, match line, line after)
-                            start = max(0, i - 1)
-                            end = min(len(lines), i + 2)
-                            snippet = ' '.join(lines[start:end]).strip()
-                            if len(snippet) > 150:
-                                snippet = snippet[:150] + '...'
-                            
-                            results.append({
-                                'name': file_info['name'],
-                                'filename': file_info['filename'],
-                                'path': file_info['relative_path'],
-                                'folder': file_info['folder'],
-                                'match_type': 'content',
-                                'snippet': snippet,
-                                'line': i + 1
-                            })
-                            break  # Only show first match per file
-        except Exception as e:
-            print(f"Error searching file {file_info['path']}: {e}")
-            continue
+    # Context: line before, match line, line after
+    line_start = text.rfind(newline, 0, idx) + 1
+    start = text.rfind(newline, 0, line_start - 1) + 1 if line_start else 0
+    line_end = text.find(newline, idx)
+    end = text.find(newline, line_end + 1) if line_end >= 0 else -1
+    context = text[start:end] if end >= 0 else text[start:]
+    line = text.count(newline, 0, idx) + 1
+    if newline == b'\n':
+        context = context.decode('ascii')
+    snippet = context.replace('\n', ' ').strip()
+    
+    if len(snippet) > 150:
+        snippet = snippet[:150] + '...'
+    return line, snippet
+
+@lru_cache(maxsize=256)
+def search_results(query_lower, version):
+    """
+    The /search results for a query. version comes from sync_search_index(), so
+    repeated queries (and further pages of one) are answered from the same
+    SearchResults until a document changes.
+    """
+    return SearchResults(query_lower, version)
+
+class SearchResults:
+    """
+    /search result dicts for one query, in listing order, or best-scoring first for
+    multi-word queries. fetch(count) only scans as far into the listing as the
+    first count results need; what was found is kept, so fetching more continues
+    from there. Ranking can't stop early: the first fetch of a multi-word query
+    scans every candidate document.
+    """
+    
+    def __init__(self, query_lower, version):
+        self._lock = threading.Lock()
+        self._results = []
+        # Result dicts (filename matches) and Futures (content scans), in listing order
+        self._window = deque()
+        
+        # Several words match documents containing any of them, ranked by hits: one
+        # alternation scans each document once for all the words (longest first, so a
+        # word that prefixes another doesn't shadow it)
+        tokens = sorted(set(query_lower.split()), key=len, reverse=True)
+        if len(tokens) > 1:
+            self._pattern = re.compile('|'.join(map(re.escape, tokens)))
+            token_candidates = [SEARCH_INDEX.candidates(token) for token in tokens]
+            candidates = None if None in token_candidates else set().union(*token_candidates)
+        else:
+            self._pattern = None
+            candidates = SEARCH_INDEX.candidates(query_lower)
+        self._entries = self._scan(get_markdown_files(), query_lower, version[0], candidates)
+    
+    def fetch(self, count):
+        """The first count results (fewer if there aren't that many), as a tuple (treat as read-only)."""
+        with self._lock:
+            if self._pattern is not None and self._entries is not None:
+                # Ranking needs every document scanned; filename matches stay first
+                entries = list(self._entries)  # submits every content scan
+                self._results = [result for result in map(self._result, entries) if result]
+                self._results.sort(key=lambda result: (result['match_type'] != 'filename', -result.get('score', 0)))
+                self._entries = None
+            while len(self._results) < count and self._entries is not None:
+                self._fill_window()
+                if not self._window:
+                    self._entries = None
+                    break
+                result = self._result(self._window.popleft())
+                if result:
+                    self._results.append(result)
+            return tuple(self._results[:count])
+    
+    def _scan(self, md_files, query_lower, root, candidates):
+        """Yield a result dict per filename match and a Future per content candidate."""
+        for file_info in md_files:
+            # Search in filename
+            if query_lower in file_info['name_lower'] or query_lower in file_info['filename_lower']:
+                yield {
+                    'name': file_info['name'],
+                    'filename': file_info['filename'],
+                    'path': file_info['relative_path'],
+                    'folder': file_info['folder'],
+                    'match_type': 'filename',
+                    'snippet': f"Found in filename: {file_info['filename']}"
+                }
+                continue
+            
+            # Search in file content (only files the index reports as possible matches).
+            # Candidates are read on the search pool so that their disk reads overlap.
+            file_path = os.path.join(root, file_info['relative_path'])
+            if candidates is None or file_path in candidates:
+                if self._pattern is None:
+                    yield SEARCH_POOL.submit(search_file_content, file_info, file_path, query_lower)
+                else:
+                    yield SEARCH_POOL.submit(search_file_tokens, file_info, file_path, self._pattern)
+    
+    def _fill_window(self):
+        while len(self._window) < SEARCH_READ_AHEAD:
+            entry = next(self._entries, None)
+            if entry is None:
+                return
+            self._window.append(entry)
     
-    return {'results': results, 'query': query, 'count': len(results)}
+    @staticmethod
+    def _result(entry):
+        return entry.result() if isinstance(entry, Future) else entry
 
-@app.route('/static/<path:filename>')
-def static_files(filename):
-    """Serve static files."""
-    return send_from_directory('static', filename)
+def search_file_content(file_info, file_path, query_lower):
+    """/search content match for one document, or None."""
+    try:
+        with open(file_path, 'rb') as f:
+            match = find_match_context(f.read(), query_lower)
+    except Exception as e:
+        logger.warning("Error searching file %s: %s", file_path, e)
+        return None
+    if not match:
+        return None
+    line, snippet = match
+    return {
+        'name': file_info['name'],
+        'filename': file_info['filename'],
+        'path': file_info['relative_path'],
+        'folder': file_info['folder'],
+        'match_type': 'content',
+        'snippet': snippet,
+        'line': line
+    }
+
+def search_file_tokens(file_info, file_path, pattern):
+    """
+    /search content match for one document against a multi-word query, or None.
+    pattern alternates the query's words; the score is how many times they occur
+    and the snippet is around the first occurrence.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        hits = pattern.findall(data.decode('utf-8').lower())
+        match = find_match_context(data, hits[0]) if hits else None
+    except Exception as e:
+        logger.warning("Error searching file %s: %s", file_path, e)
+        return None
+    if not match:
+        return None
+    line, snippet = match
+    return {
+        'name': file_info['name'],
+        'filename': file_info['filename'],
+        'path': file_info['relative_path'],
+        'folder': file_info['folder'],
+        'match_type': 'content',
+        'snippet': snippet,
+        'line': line,
+        'score': len(hits)
+    }
 
 # ============================================================================
 # NEW ROUTES FOR v1.4.0 FEATURES
@@ -1699,58 +2803,126 @@ def save_document():
         if not file_path.exists():
             return jsonify({'error': 'File not found'}), 404
         
-        # Create backup
+        # Write the new content to a temporary file first, then swap it in with a single
+        # rename, so the document always exists in either its old or its new version.
+        # Symlinked documents are written through to their target.
+        target = Path(os.path.realpath(file_path))
         backup_path = file_path.with_suffix(file_path.suffix + '.bak')
+        tmp_path = target.with_name(target.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            shutil.copymode(target, tmp_path)
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.error(f"Failed to save document: {e}")
+            return jsonify({'error': 'Failed to save document'}), 500
+        
+        # Back up the current version: a hard link to it when possible (nothing is
+        # copied), swapped in over the previous backup. A document with other hard
+        # links (besides a previous backup) is rewritten in place instead, since a
+        # rename would detach them; its backup is then a copy.
+        backup_tmp = backup_path.with_name(backup_path.name + '.tmp')
         try:
-            shutil.copy(file_path, backup_path)
+            links = target.stat().st_nlink
+            if backup_path.exists() and os.path.samefile(backup_path, target):
+                links -= 1
+            in_place = links > 1
+            backup_tmp.unlink(missing_ok=True)
+            if in_place:
+                shutil.copy2(target, backup_tmp)
+            else:
+                try:
+                    os.link(target, backup_tmp)
+                except OSError:
+                    # File system without hard links
+                    shutil.copy2(target, backup_tmp)
+            os.replace(backup_tmp, backup_path)
             logger.info(f"Backup created: {backup_path}")
         except Exception as e:
+            backup_tmp.unlink(missing_ok=True)
+            tmp_path.unlink(missing_ok=True)
             logger.error(f"Failed to create backup: {e}")
             return jsonify({'error': 'Failed to create backup'}), 500
         
-        # Write new content
+        # Move the new content into place
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            logger.info(f"Document saved: {filename}, size: {len(content)} bytes")
-            return jsonify({'success': True, 'backup': str(backup_path), 'size': len(content)})
+            if in_place:
+                shutil.copyfile(tmp_path, target)
+                tmp_path.unlink()
+            else:
+                os.replace(tmp_path, target)
         except Exception as e:
-            # Restore from backup if write failed
-            if backup_path.exists():
-                shutil.copy(backup_path, file_path)
+            tmp_path.unlink(missing_ok=True)
             logger.error(f"Failed to save document: {e}")
             return jsonify({'error': 'Failed to save document'}), 500
+        
+        invalidate_listing_cache()
+        logger.info(f"Document saved: {filename}, size: {len(content)} bytes")
+        return jsonify({'success': True, 'backup': str(backup_path), 'size': len(content)})
     
     except Exception as e:
         logger.error(f"Error in save_document: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+# Log archives: fast deflate (logs are highly repetitive) over 1 MiB text blocks
+LOG_ARCHIVE_LEVEL = 3
+LOG_ARCHIVE_CHUNK = 1 << 20
+
+class ZipStream(io.RawIOBase):
+    """Unseekable sink for zipfile.ZipFile whose written bytes are collected with drain()."""
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
 @app.route('/api/download-logs')
 def download_logs():
-    """Create sanitized ZIP of logs for user download."""
-    try:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        zip_filename = f'omnidoc_logs_{timestamp}.zip'
-        zip_path = LOG_DIR / zip_filename
-        
-        logger.info(f"Creating log archive: {zip_filename}")
-        
-        # Create ZIP
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            for log_file in LOG_DIR.glob('omnidoc.log*'):
+    """Stream a sanitized ZIP of the logs to the user (nothing is written to disk)."""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    zip_filename = f'omnidoc_logs_{timestamp}.zip'
+    logger.info(f"Creating log archive: {zip_filename}")
+    
+    def generate():
+        # zipfile writes to an unseekable stream with data descriptors, so each
+        # entry can be sent as soon as it has been added
+        stream = ZipStream()
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=LOG_ARCHIVE_LEVEL) as zipf:
+            for log_file in sorted(LOG_DIR.glob(LOG_FILE.name + '*')):
                 try:
-                    # Sanitize content
-                    sanitized_content = sanitize_log_content(log_file.read_text(encoding='utf-8', errors='ignore'))
-                    zipf.writestr(log_file.name, sanitized_content)
+                    with open(log_file, 'r', encoding='utf-8', errors='ignore') as src, zipf.open(log_file.name, 'w') as dst:
+                        # Sanitize content a block of whole lines at a time (no pattern
+                        # spans a line break), so a log is never held in memory at once
+                        tail = ''
+                        while chunk := src.read(LOG_ARCHIVE_CHUNK):
+                            chunk = tail + chunk
+                            cut = chunk.rfind('\n') + 1
+                            tail = chunk[cut:]
+                            if cut:
+                                dst.write(sanitize_log_content(chunk[:cut]).encode('utf-8'))
+                                yield stream.drain()
+                        dst.write(sanitize_log_content(tail).encode('utf-8'))
                 except Exception as e:
                     logger.error(f"Error adding log file {log_file}: {e}")
-        
-        logger.info(f"Log archive created: {zip_path}")
-        return send_from_directory(LOG_DIR, zip_filename, as_attachment=True)
+                yield stream.drain()
+        yield stream.drain()
+        logger.info(f"Log archive sent: {zip_filename}")
     
-    except Exception as e:
-        logger.error(f"Error creating log archive: {e}", exc_info=True)
-        return jsonify({'error': 'Failed to create log archive'}), 500
+    return Response(generate(), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename="{zip_filename}"'})
 
 @app.route('/api/workspaces', methods=['GET'])
 def get_workspaces():
@@ -1840,6 +3012,7 @@ def set_active_workspace():
         # Update global MD_FOLDER
         global MD_FOLDER
         MD_FOLDER = Path(workspace_path)
+        invalidate_listing_cache()
         
         logger.info(f"Active workspace changed to: {workspace_path}")
         return jsonify({'success': True, 'active_workspace': workspace_path})
@@ -1896,10 +3069,13 @@ def api_install_wkhtmltopdf():
 @app.route('/api/browse-folder', methods=['GET'])
 def browse_folder():
     """Open native folder browser dialog."""
+    # Imported (or found missing) once; later calls reuse the cached result
+    tk = optional_import('tkinter', 'Native folder browser')
+    filedialog = tk and optional_import('tkinter.filedialog', 'Native folder browser')
+    if filedialog is None:
+        return jsonify({'error': 'Native folder browser not available. Please enter path manually.'}), 501
+    
     try:
-        import tkinter as tk
-        from tkinter import filedialog
-        
         # Create and hide root window
         root = tk.Tk()
         root.withdraw()
@@ -1918,9 +3094,6 @@ def browse_folder():
         else:
             return jsonify({'success': False, 'message': 'No folder selected'}), 400
             
-    except ImportError:
-        logger.warning("tkinter not available for native folder browser")
-        return jsonify({'error': 'Native folder browser not available. Please enter path manually.'}), 501
     except Exception as e:
         logger.error(f"Error opening folder browser: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
@@ -1942,32 +3115,44 @@ def search_files():
     if not query:
         return jsonify([])
     
+    return jsonify(search_matches(query, sync_search_index(get_markdown_files())))
+
+@lru_cache(maxsize=256)
+def search_matches(query, version):
+    """/api/search matches (relative paths) for a lowercase query as a tuple, cached like search_results()."""
     matches = []
     # Reuse existing logic to get file list
     all_files = get_markdown_files()
+    root = version[0]
+    candidates = SEARCH_INDEX.candidates(query)
     
     for file_info in all_files:
         # Check filename match first (fastest)
         # Note: 'name' is filename without extension, 'filename' is with extension
         # We search both to be safe
-        if query in file_info['name'].lower() or query in file_info['filename'].lower():
+        if query in file_info['name_lower'] or query in file_info['filename_lower']:
             matches.append(file_info['relative_path'])
             continue
             
         # Check content match
-        file_path = file_info.get('path')
+        file_path = os.path.join(root, file_info['relative_path'])
         
-        # Only search text-based files
-        if file_path and file_path.suffix.lower() in ['.md', '.txt', '.markdown']:
+        # Only search text-based files the index reports as possible matches
+        if file_info['type'] in TEXT_EXTENSIONS and (candidates is None or file_path in candidates):
             try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read().lower()
-                    if query in content:
-                        matches.append(file_info['relative_path'])
+                with open(file_path, 'rb') as f:
+                    content = fold_case(f.read())
+                # ASCII documents stay bytes; a non-ASCII query can't occur in them
+                if isinstance(content, bytes):
+                    found = query.isascii() and query.encode('ascii') in content
+                else:
+                    found = query in content
+                if found:
+                    matches.append(file_info['relative_path'])
             except Exception:
                 continue # Skip unreadable files
                 
-    return jsonify(matches)
+    return tuple(matches)
 
 if __name__ == '__main__':
     app.run(debug=True, host='localhost', port=8000)
@@ -1,9 +1,89 @@
+from contextlib import contextmanager
 from typing import List, Callable
 import markdown
 import re
+import threading
 
 # Baseline/standard rendering: just Markdown -> HTML with extensions
 
+MARKDOWN_EXTENSIONS = [
+    'fenced_code',
+    'tables',
+    'nl2br',
+    'sane_lists',
+    'codehilite',
+    'toc',
+    'extra',
+    'attr_list',
+    'def_list',
+    'abbr',
+    'footnotes',
+    'md_in_html',
+    'admonition',
+    'pymdownx.arithmatex',
+    'pymdownx.betterem',
+    'pymdownx.caret',
+    'pymdownx.mark',
+    'pymdownx.tilde',
+    'pymdownx.details',
+    'pymdownx.highlight',
+    'pymdownx.inlinehilite',
+    'pymdownx.keys',
+    'pymdownx.smartsymbols',
+    'pymdownx.snippets',
+    'pymdownx.superfences',
+    'pymdownx.tabbed',
+    'pymdownx.tasklist',
+    'pymdownx.magiclink',
+]
+
+# Extensions that can only act on text containing one of their markers. They are
+# left out for documents without any (fewer processors and patterns to try per
+# block and per inline run), which converts them exactly as with the full set.
+OPTIONAL_EXTENSION_MARKERS = {
+    'admonition': ('!!!',),
+    'pymdownx.arithmatex': ('$', '\\'),
+    'pymdownx.details': ('???',),
+    'pymdownx.keys': ('++',),
+    'pymdownx.tabbed': ('===',),
+}
+# Snippets pull in other files, whose markers can't be seen up front: documents
+# using them always get every extension
+SNIPPET_MARKER = '--8<--'
+
+# Building a Markdown instance loads and configures every extension, which costs
+# more than converting a typical document. Idle instances are pooled per extension
+# set and reset between documents. They are not safe to share across threads, so
+# each conversion checks one out under the lock and returns it afterwards; the
+# pool outlives the server's per-request threads.
+_MARKDOWN_POOL = {}  # frozenset of skipped extensions -> [idle Markdown instances]
+MARKDOWN_POOL_SIZE = 4  # idle instances kept per extension set
+_markdown_pool_lock = threading.Lock()
+
+
+@contextmanager
+def _markdown_instance(md_text: str):
+    if SNIPPET_MARKER in md_text:
+        skipped = frozenset()
+    else:
+        skipped = frozenset(
+            ext for ext, markers in OPTIONAL_EXTENSION_MARKERS.items()
+            if not any(marker in md_text for marker in markers)
+        ) | {'pymdownx.snippets'}
+    with _markdown_pool_lock:
+        idle = _MARKDOWN_POOL.setdefault(skipped, [])
+        md_instance = idle.pop() if idle else None
+    if md_instance is None:
+        md_instance = markdown.Markdown(
+            extensions=[ext for ext in MARKDOWN_EXTENSIONS if ext not in skipped])
+    try:
+        yield md_instance.reset()
+    finally:
+        with _markdown_pool_lock:
+            if len(idle) < MARKDOWN_POOL_SIZE:
+                idle.append(md_instance)
+
+
 def render_baseline(md_text: str) -> str:
     # 1. Remove [TOC] marker to prevents markdown extension from injecting it into body
     # (We render TOC separately in the template)
@@ -14,43 +94,12 @@ def render_baseline(md_text: str) -> str:
     md_text = re.sub(r'<!--TOC_PLACEHOLDER_START-->.*?<!--TOC_PLACEHOLDER_END-->', '', md_text, flags=re.DOTALL)
     
     # Render markdown to HTML
-    md_instance = markdown.Markdown(
-        extensions=[
-            'fenced_code',
-            'tables',
-            'nl2br',
-            'sane_lists',
-            'codehilite',
-            'toc',
-            'extra',
-            'attr_list',
-            'def_list',
-            'abbr',
-            'footnotes',
-            'md_in_html',
-            'admonition',
-            'pymdownx.arithmatex',
-            'pymdownx.betterem',
-            'pymdownx.caret',
-            'pymdownx.mark',
-            'pymdownx.tilde',
-            'pymdownx.details',
-            'pymdownx.highlight',
-            'pymdownx.inlinehilite',
-            'pymdownx.keys',
-            'pymdownx.smartsymbols',
-            'pymdownx.snippets',
-            'pymdownx.superfences',
-            'pymdownx.tabbed',
-            'pymdownx.tasklist',
-            'pymdownx.magiclink',
-        ]
-    )
-    
-    html_output = md_instance.convert(md_text)
+    with _markdown_instance(md_text) as md_instance:
+        html_output = md_instance.convert(md_text)
+        toc = md_instance.toc
     
     # Return both HTML (clean of TOC) and the TOC generated by python-markdown
-    return html_output, md_instance.toc
+    return html_output, toc
 
 
 def run_pipeline(md_text: str, steps: List[Callable[[str], str]]) -> str:
@@ -1,8 +1,16 @@
 import re
-from typing import Tuple, List, Optional
+from typing import List
+
+from docnexus.features.standard import iter_code_fences
 
 # Smart feature handlers always accept and return markdown text
 
+# Precompiled patterns
+SPACED_COLUMNS_RE = re.compile(r"\S\s{2,}\S")
+COLUMN_GAP_RE = re.compile(r"\s{2,}")
+EDGE_RE = re.compile(r"^\s*([A-Za-z0-9_.-]{2,})\s*(?:->|=>)\s*([A-Za-z0-9_.-]{2,})\s*:?\s*(.*)")
+NODE_WORD_RE = re.compile(r"[A-Za-z0-9_]{3,}")
+
 def convert_ascii_tables_to_markdown(md: str) -> str:
     lines = md.splitlines()
     out = []
@@ -10,7 +18,7 @@ def convert_ascii_tables_to_markdown(md: str) -> str:
     while i < len(lines):
         line = lines[i]
         # detect a space/pipe separated header row
-        if re.search(r"\S\s{2,}\S", line):
+        if SPACED_COLUMNS_RE.search(line):
             # collect block until blank line
             block = [line]
             j = i + 1
@@ -18,12 +26,12 @@ def convert_ascii_tables_to_markdown(md: str) -> str:
                 block.append(lines[j])
                 j += 1
             # turn into markdown table by splitting on 2+ spaces
-            cols = [c.strip() for c in re.split(r"\s{2,}", block[0].strip())]
+            cols = [c.strip() for c in COLUMN_GAP_RE.split(block[0].strip())]
             if len(cols) > 1:
                 out.append("| " + " | ".join(cols) + " |")
                 out.append("| " + " | ".join(['---'] * len(cols)) + " |")
                 for row in block[1:]:
-                    cells = [c.strip() for c in re.split(r"\s{2,}", row.strip())]
+                    cells = [c.strip() for c in COLUMN_GAP_RE.split(row.strip())]
                     out.append("| " + " | ".join(cells) + " |")
                 i = j
                 continue
@@ -45,8 +53,15 @@ def _looks_like_program_code(text: str) -> bool:
 
 def _heading_before(md: str, start_idx: int) -> str:
     # Find nearest preceding Markdown heading within ~10 lines
-    up_to = md[:start_idx]
-    lines = up_to.splitlines()
+    # Only the last 12 lines matter, so split a window ending at start_idx, grown
+    # until it holds more than that (its first line may be partial and is skipped)
+    window = 2048
+    while True:
+        begin = max(0, start_idx - window)
+        lines = md[begin:start_idx].splitlines()
+        if begin == 0 or len(lines) > 12:
+            break
+        window *= 4
     for line in reversed(lines[-12:]):
         if line.strip().startswith('#'):
             return line.strip().lower()
@@ -80,55 +95,52 @@ def convert_sip_signaling_to_mermaid(md: str) -> str:
       - The block does not look like programming code, AND
       - The block is not explicitly a programming language (c, cpp, java, go, rust, js, ts, py)
     """
-    code_fence_re = re.compile(r"```(?P<lang>[^\n]*)\n(?P<body>.*?)\n```", re.DOTALL)
     out = []
     last = 0
 
-    for m in code_fence_re.finditer(md):
-        out.append(md[last:m.start()])
-        lang = (m.group('lang') or '').strip().lower()
-        body = m.group('body')
+    for start, end, lang, body in iter_code_fences(md):
+        out.append(md[last:start])
+        lang = lang.strip().lower()
 
         # Skip obvious programming languages
         skip_langs = {"c", "cpp", "c++", "java", "go", "rust", "js", "ts", "javascript", "typescript", "python", "py", "json", "xml"}
         if lang in skip_langs:
-            out.append(m.group(0))
-            last = m.end()
+            out.append(md[start:end])
+            last = end
             continue
 
-        heading = _heading_before(md, m.start())
+        heading = _heading_before(md, start)
         # Skip conversion if explicitly marked as code-only
-        if _has_marker(md, m.start(), 'code-only'):
-            out.append(m.group(0))
-            last = m.end()
+        if _has_marker(md, start, 'code-only'):
+            out.append(md[start:end])
+            last = end
             continue
 
         # If we have a candidate-sip marker, we can relax heading requirement
-        has_candidate_marker = _has_marker(md, m.start(), 'candidate-sip')
+        has_candidate_marker = _has_marker(md, start, 'candidate-sip')
         if not has_candidate_marker and not _has_sip_context(heading):
-            out.append(m.group(0))
-            last = m.end()
+            out.append(md[start:end])
+            last = end
             continue
 
         if _looks_like_program_code(body) or not _block_has_sip_markers(body):
-            out.append(m.group(0))
-            last = m.end()
+            out.append(md[start:end])
+            last = end
             continue
 
         lines = [l for l in body.splitlines() if l.strip()]
         # require at least one message with a SIP method/response
         has_sip_message = any(any(mn in l for mn in SIP_METHODS) or RESP_CODE_RE.search(l) for l in lines)
         if not has_sip_message:
-            out.append(m.group(0))
-            last = m.end()
+            out.append(md[start:end])
+            last = end
             continue
 
         mer = ["```mermaid", "sequenceDiagram"]
         participants: List[str] = []
-        edge_re = re.compile(r"^\s*([A-Za-z0-9_.-]{2,})\s*(?:->|=>)\s*([A-Za-z0-9_.-]{2,})\s*:?\s*(.*)")
 
         for l in lines:
-            mm = edge_re.findall(l)
+            mm = EDGE_RE.findall(l)
             if mm:
                 a, b, _msg = mm[0]
                 if a not in participants:
@@ -138,21 +150,21 @@ def convert_sip_signaling_to_mermaid(md: str) -> str:
 
         # sanity: participants count reasonable
         if not (2 <= len(participants) <= 8):
-            out.append(m.group(0))
-            last = m.end()
+            out.append(md[start:end])
+            last = end
             continue
 
         for p in participants:
             mer.append(f"participant {p}")
 
         for l in lines:
-            mm = edge_re.findall(l)
+            mm = EDGE_RE.findall(l)
             if mm:
                 a, b, msg = mm[0]
                 mer.append(f"{a}->>{b}: {msg}")
         mer.append("```")
         out.append("\n".join(mer))
-        last = m.end()
+        last = end
 
     out.append(md[last:])
     return "".join(out)
@@ -171,7 +183,7 @@ def convert_topology_to_mermaid(md: str) -> str:
     # naive: list unique words as nodes
     nodes = set()
     for l in lines:
-        for w in re.findall(r"[A-Za-z0-9_]{3,}", l):
+        for w in NODE_WORD_RE.findall(l):
             nodes.add(w)
     nodes = list(nodes)[:8]
     for n in nodes:
@@ -1,37 +1,135 @@
 import re
-from typing import List, Tuple
-
-
+from functools import lru_cache
+from typing import Iterator, List, Tuple
+
+# Precompiled patterns (the helpers below run them on every line of a document)
+SLUG_STRIP_RE = re.compile(r"[^\w\s-]")
+WHITESPACE_RE = re.compile(r"\s+")
+DASHES_RE = re.compile(r"-+")
+# _slugify's two character classes for ASCII text, as one str.translate() table:
+# whitespace becomes '-', anything else but word characters and '-' is dropped
+SLUG_ASCII_TABLE = str.maketrans({
+    chr(c): '-' if chr(c).isspace() else None
+    for c in range(128) if not (chr(c).isalnum() or chr(c) in '_-')
+})
+ASCII_LETTER_RE = re.compile(r"[A-Za-z]")
+NUMBER_PREFIX_RE = re.compile(r"^\s*(\d+(?:\.\d+)*|[IVXLCDM]+|[A-Z])(?:[\.)])?\s+")
+DOTTED_NUMBER_RE = re.compile(r"^\d+(?:\.\d+)*$")
+# ATX heading: group 1 = hashes, 2 = text (explicit {#id} included, see _split_heading_id)
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+HEADING_ID_CHARS_RE = re.compile(r"[A-Za-z0-9_-]+")
+ID_HEADING_RE = re.compile(r"^(#{1,6})\s+.*\{#[A-Za-z0-9_-]+\}\s*$")
+SETEXT_H1_RE = re.compile(r"^[=]{3,}\s*$")
+SETEXT_H2_RE = re.compile(r"^-{3,}\s*$")
+SETEXT_UNDERLINE_RE = re.compile(r"^[=-]{3,}\s*$")
+# Lines that start a list item, table row or quote, or are a horizontal rule
+BLOCK_LINE_RE = re.compile(r"\s*(?:[*\-+]\s|\d+[\.)]\s|[|>]|([-*_])\1{2,}\s*$)")
+MD_LINK_RE = re.compile(r"\[[^\]]+\]\([^\)]+\)")
+WORD_RE = re.compile(r"[A-Za-z']+")
+HEADING_ID_RE = re.compile(r"\{#([A-Za-z0-9_-]+)\}\s*$")
+SPACED_HEADING_ID_RE = re.compile(r"\s*\{#([A-Za-z0-9_-]+)\}\s*$")
+ATTR_TOKEN_RE = re.compile(r"\s*\{#?[A-Za-z0-9_-]+\}")
+TRAILING_ATTR_RE = re.compile(r"\s*\{#[^}]+\}\s*$")
+SECTION_NUMBER_RE = re.compile(r"^\s*(?:\d+\.)+\s*|\s*^[IVXLCDMivxlcdm]+\.\s*|^\s*[A-Z]\.\s*")
+# Inline markdown stripped from TOC entries, applied in this order (each pass
+# unwraps what the previous ones left, e.g. **_x_**), with the delimiter every
+# match contains so that a pass can be skipped when it's absent
+INLINE_FORMAT_RES = (
+    ('*', re.compile(r"\*\*([^*]+)\*\*")),  # **bold**
+    ('_', re.compile(r"__([^_]+)__")),      # __bold__
+    ('*', re.compile(r"\*([^*]+)\*")),      # *italic*
+    ('_', re.compile(r"_([^_]+)_")),        # _italic_
+    ('`', re.compile(r"`([^`]+)`")),        # `code`
+    ('~', re.compile(r"~~([^~]+)~~")),      # ~~strikethrough~~
+)
+# Collapse button of TOC entries with children
+TOC_TOGGLE_HTML = '<button class="toc-toggle" aria-expanded="true" title="Collapse section"></button>'
+
+# Words that make a standalone line read as a sentence rather than a heading
+HEADING_STOPWORDS = frozenset({"the","a","an","and","or","but","if","then","than","because","as","of","at","by","for","with","about","into","through","during","before","after","above","below","to","from","up","down","in","out","on","off","over","under"})
+HEADING_AUX_VERBS = frozenset({"is","are","was","were","be","being","been","have","has","had","do","does","did","will","shall","can","should","may","might","must"})
+
+# annotate_blocks() detectors
+PROGRAM_CODE_TOKENS = (";", "=", "++", "--", "{", "}", "return ", "for ", "while ", "if (")
+TOPOLOGY_CHARS = ("┌", "─", "┐", "│", "└", "┘")
+SIP_METHOD_NAMES = ("INVITE", "ACK", "BYE", "CANCEL", "REGISTER", "OPTIONS", "PRACK", "SUBSCRIBE", "NOTIFY", "PUBLISH", "INFO", "REFER", "MESSAGE", "UPDATE")
+
+SIP_RESPONSE_LINE_RE = re.compile(r"^(1|2|3|4|5|6)\d\d\b", re.MULTILINE)
+FLOW_EDGE_RE = re.compile(r"\b[A-Za-z0-9_.-]{2,}\s*->\s*[A-Za-z0-9_.-]{2,}\b")
+
+
+# Cached: the same heading text is slugified by several pipeline steps
+@lru_cache(maxsize=4096)
 def _slugify(text: str) -> str:
     s = text.strip().lower()
-    s = re.sub(r"[^\w\s-]", "", s)
-    s = re.sub(r"\s+", "-", s)
-    s = re.sub(r"-+", "-", s)
+    if s.isascii():
+        s = s.translate(SLUG_ASCII_TABLE)
+    else:
+        s = SLUG_STRIP_RE.sub("", s)
+        s = WHITESPACE_RE.sub("-", s)
+    if '--' in s:
+        s = DASHES_RE.sub("-", s)
     s = s.strip('-')
     return s
 
 
+def _split_heading_id(text: str) -> Tuple[str, str]:
+    """Heading text without surrounding whitespace and its trailing {#id}, if any ('' if not)."""
+    text = text.strip()
+    if text.endswith('}'):
+        start = text.rfind('{#')
+        if start != -1 and HEADING_ID_CHARS_RE.fullmatch(text, start + 2, len(text) - 1):
+            return text[:start].rstrip(), text[start + 2:-1]
+    return text, ''
+
+
+def iter_code_fences(md: str) -> Iterator[Tuple[int, int, str, str]]:
+    """
+    (start, end, lang, body) of each fenced code block, as matched by
+    ```lang\nbody\n``` with the shortest body. Found with str.find rather than a
+    lazy regex, which steps through every character of every block.
+    """
+    pos = 0
+    while True:
+        start = md.find("```", pos)
+        if start == -1:
+            return
+        lang_end = md.find("\n", start + 3)
+        if lang_end == -1:
+            return
+        body_end = md.find("\n```", lang_end + 1)
+        if body_end == -1:
+            return
+        pos = body_end + 4
+        yield start, pos, md[start + 3:lang_end], md[lang_end + 1:body_end]
+
+
+# The three heading tests below are cached too: they only see short standalone
+# lines, which repeat across documents with recurring stanzas (logs, transcripts)
+@lru_cache(maxsize=4096)
 def _is_title_case(text: str) -> bool:
-    words = [w for w in re.split(r"\s+", text) if w]
+    words = [w for w in WHITESPACE_RE.split(text) if w]
     if not words or len(words) > 15:
         return False
     cap = sum(1 for w in words if w[0].isalpha() and w[0].isupper())
     return cap / max(1, len(words)) >= 0.6
 
 
+@lru_cache(maxsize=4096)
 def _is_all_caps(text: str) -> bool:
-    letters = re.findall(r"[A-Za-z]", text)
+    letters = ASCII_LETTER_RE.findall(text)
     if not letters:
         return False
     return all(ch.isupper() for ch in letters)
 
 
+@lru_cache(maxsize=4096)
 def _numeric_heading_level(text: str) -> int:
-    m = re.match(r"^\s*(\d+(?:\.\d+)*|[IVXLCDM]+|[A-Z])(?:[\.)])?\s+", text)
+    m = NUMBER_PREFIX_RE.match(text)
     if not m:
         return 0
     part = m.group(1)
-    if re.match(r"^\d+(?:\.\d+)*$", part):
+    if DOTTED_NUMBER_RE.match(part):
         return part.count('.') + 1
     return 1
 
@@ -50,23 +148,24 @@ def normalize_headings(md: str) -> str:
 
     # collect existing heading slugs
     for line in lines:
-        if re.match(r"^```", line):
+        if line.startswith("```"):
             in_code = not in_code
             continue
         if in_code:
             continue
-        m = re.match(r"^(#{1,6})\s+(.*?)(?:\s*\{#([A-Za-z0-9_-]+)\})?\s*$", line)
+        m = line.startswith("#") and HEADING_RE.match(line)
         if m:
-            text = m.group(2).strip()
-            slug = m.group(3) or _slugify(text)
+            text, heading_id = _split_heading_id(m.group(2))
+            slug = heading_id or _slugify(text)
             used_slugs[slug] = max(used_slugs.get(slug, 0), 1)
 
     in_code = False
     out: List[str] = []
+    stripped_lines = [line.strip() for line in lines]
     i = 0
     while i < n:
         line = lines[i]
-        if re.match(r"^```", line):
+        if line.startswith("```"):
             in_code = not in_code
             out.append(line)
             i += 1
@@ -76,11 +175,11 @@ def normalize_headings(md: str) -> str:
             i += 1
             continue
 
-        m_atx = re.match(r"^(#{1,6})\s+(.*?)(\s*\{#([A-Za-z0-9_-]+)\})?\s*$", line)
+        m_atx = line.startswith("#") and HEADING_RE.match(line)
         if m_atx:
             level = len(m_atx.group(1))
-            text = m_atx.group(2).strip()
-            if m_atx.group(4):
+            text, heading_id = _split_heading_id(m_atx.group(2))
+            if heading_id:
                 out.append(line)
             else:
                 slug = uniq_slug(text)
@@ -88,8 +187,8 @@ def normalize_headings(md: str) -> str:
             i += 1
             continue
 
-        if i + 1 < n and re.match(r"^[=]{3,}\s*$", lines[i + 1]):
-            text = line.strip()
+        if i + 1 < n and SETEXT_H1_RE.match(lines[i + 1]):
+            text = stripped_lines[i]
             # Skip if text is empty (avoid blank headings)
             if text:
                 slug = uniq_slug(text)
@@ -97,47 +196,44 @@ def normalize_headings(md: str) -> str:
                 i += 2
                 continue
         # Skip setext-style --- if it looks like a horizontal rule (blank line above or below)
-        if i + 1 < n and re.match(r"^-{3,}\s*$", lines[i + 1]):
-            text = line.strip()
+        if i + 1 < n and SETEXT_H2_RE.match(lines[i + 1]):
+            text = stripped_lines[i]
             # Only treat as heading if:
             # 1. Text is not empty
             # 2. Not preceded by blank line (which makes --- a horizontal rule)
             # 3. Has actual content that looks like a heading
-            prev_line_blank = (i == 0) or (lines[i - 1].strip() == "")
+            prev_line_blank = (i == 0) or not stripped_lines[i - 1]
             if text and not prev_line_blank and len(text) <= 100:
                 slug = uniq_slug(text)
                 out.append(f"## {text} {{#{slug}}}")
                 i += 2
                 continue
 
-        prev_blank = (i == 0) or (lines[i - 1].strip() == "")
-        next_blank = (i + 1 >= n) or (lines[i + 1].strip() == "")
-        is_list_like = bool(re.match(r"^\s*([*\-+]\s+|\d+[\.)]\s+)", line))
-        is_table_like = '|' in line and re.match(r"^\s*\|", line)
-        is_quote = line.strip().startswith('>')
-        is_rule = re.match(r"^\s*([-*_])\1{2,}\s*$", line) is not None
-        is_link_like = ('http://' in line or 'https://' in line or re.search(r"\[[^\]]+\]\([^\)]+\)", line))
-        short_enough = len(line.strip()) <= 80
-        no_terminal_period = not line.strip().endswith('.')
-
-        title_like = (_is_title_case(line.strip()) or _is_all_caps(line.strip()))
-        num_level = _numeric_heading_level(line)
-
-        STOPWORDS = {"the","a","an","and","or","but","if","then","than","because","as","of","at","by","for","with","about","into","through","during","before","after","above","below","to","from","up","down","in","out","on","off","over","under"}
-        AUX_VERBS = {"is","are","was","were","be","being","been","have","has","had","do","does","did","will","shall","can","should","may","might","must"}
-        words = [w.lower() for w in re.findall(r"[A-Za-z']+", line)]
-        stop_ratio = (sum(1 for w in words if w in STOPWORDS) / max(1, len(words))) if words else 0.0
-        has_aux = any(w in AUX_VERBS for w in words)
-
-        if prev_blank and next_blank and not is_list_like and not is_table_like and not is_quote and not is_rule and not is_link_like and short_enough and no_terminal_period and (title_like or num_level > 0) and stop_ratio <= 0.5 and not has_aux:
-            level = 2
-            if num_level > 0:
-                level = min(6, 1 + num_level)
-            text = re.sub(r"^\s*(\d+(?:\.\d+)*|[IVXLCDM]+|[A-Z])(?:[\.)])?\s+", "", line).strip()
-            slug = uniq_slug(text)
-            out.append(f"{'#' * level} {text} {{#{slug}}}")
-            i += 1
-            continue
+        # A short line standing alone between blank lines may be an unmarked heading.
+        # The tests run cheapest first, so most lines are settled without a regex.
+        stripped = stripped_lines[i]
+        if (stripped
+                and (i == 0 or not stripped_lines[i - 1])
+                and (i + 1 >= n or not stripped_lines[i + 1])
+                and len(stripped) <= 80
+                and not stripped.endswith('.')
+                and not BLOCK_LINE_RE.match(line)
+                and 'http://' not in line and 'https://' not in line
+                and not MD_LINK_RE.search(line)):
+            num_level = _numeric_heading_level(line)
+            if num_level > 0 or _is_title_case(stripped) or _is_all_caps(stripped):
+                words = list(map(str.lower, WORD_RE.findall(line)))
+                # Repeated stopwords count each time, so no set intersection here
+                stop_ratio = (sum(map(HEADING_STOPWORDS.__contains__, words)) / len(words)) if words else 0.0
+                if stop_ratio <= 0.5 and HEADING_AUX_VERBS.isdisjoint(words):
+                    level = 2
+                    if num_level > 0:
+                        level = min(6, 1 + num_level)
+                    text = NUMBER_PREFIX_RE.sub("", line).strip()
+                    slug = uniq_slug(text)
+                    out.append(f"{'#' * level} {text} {{#{slug}}}")
+                    i += 1
+                    continue
 
         out.append(line)
         i += 1
@@ -147,29 +243,33 @@ def normalize_headings(md: str) -> str:
 
 def sanitize_attr_tokens(md: str) -> str:
     lines = md.splitlines()
+    # Only lines with a '{' are ever changed (joining the lines still normalizes
+    # line breaks), so documents without one are done
+    if '{' not in md:
+        return "\n".join(lines)
     out: List[str] = []
     in_code = False
     i = 0
     while i < len(lines):
         line = lines[i]
-        if re.match(r"^```", line):
+        if line.startswith("```"):
             in_code = not in_code
             out.append(line)
             i += 1
             continue
-        if in_code:
+        if in_code or '{' not in line:
             out.append(line)
             i += 1
             continue
         # Keep proper heading lines with attr IDs intact - these will be processed by attr_list extension
-        if re.match(r"^(#{1,6})\s+.*\{#[A-Za-z0-9_-]+\}\s*$", line):
+        if line.startswith("#") and ID_HEADING_RE.match(line):
             # Ensure proper format for attr_list extension: must have space before {#
-            cleaned_heading = re.sub(r"\s*\{#([A-Za-z0-9_-]+)\}\s*$", r" {#\1}", line)
+            cleaned_heading = SPACED_HEADING_ID_RE.sub(r" {#\1}", line)
             out.append(cleaned_heading.rstrip())
             i += 1
             continue
         # Preserve setext headings by passing both lines as-is
-        if i + 1 < len(lines) and re.match(r"^[=-]{3,}\s*$", lines[i + 1]):
+        if i + 1 < len(lines) and SETEXT_UNDERLINE_RE.match(lines[i + 1]):
             out.append(line)
             i += 1
             out.append(lines[i])
@@ -177,7 +277,7 @@ def sanitize_attr_tokens(md: str) -> str:
             continue
         # Strip attr-like tokens globally in non-heading content (tables, paragraphs)
         # Matches {#slug} or {slug} composed of alnum, dash, underscore
-        cleaned = re.sub(r"\s*\{#?[A-Za-z0-9_-]+\}", "", line)
+        cleaned = ATTR_TOKEN_RE.sub("", line)
         out.append(cleaned)
         i += 1
     return "\n".join(out)
@@ -192,13 +292,13 @@ def build_toc(md: str) -> str:
 
     for idx, line in enumerate(lines):
         # Track code blocks to skip headings inside them
-        if re.match(r"^```", line):
+        if line.startswith("```"):
             in_code = not in_code
             continue
         if in_code:
             continue
             
-        m = re.match(r"^(#{1,6})\s+(.*)$", line)
+        m = line.startswith("#") and HEADING_RE.match(line)
         if m:
             level = len(m.group(1))
             text = m.group(2).strip()
@@ -213,7 +313,7 @@ def build_toc(md: str) -> str:
 
     # Ensure explicit IDs
     for level, text, idx in headings:
-        if re.search(r"\{#([A-Za-z0-9_-]+)\}\s*$", lines[idx]):
+        if HEADING_ID_RE.search(lines[idx]):
             continue
         anchor = _slugify(text)
         lines[idx] = f"{'#' * level} {text} {{#{anchor}}}"
@@ -221,139 +321,100 @@ def build_toc(md: str) -> str:
     # Build hierarchical structure using actual heading levels
     # This creates a proper tree structure regardless of whether document uses H1+H2 or H2 as main sections
     def build_hierarchy_tree(headings_data):
-        """Build a tree structure from flat heading list based on levels."""
+        """Build a numbered tree structure from flat heading list based on levels."""
         if not headings_data:
             return []
         
         # Convert headings to node format
         nodes = []
         for level, text, idx in headings_data:
-            display_text = re.sub(r"\s*\{#[^}]+\}\s*$", "", text).strip()
+            display_text = (TRAILING_ATTR_RE.sub("", text) if '{#' in text else text).strip()
             if not display_text:  # Skip blank headings
                 continue
             # Strip numeric/lettered prefixes from heading text (e.g., "1.", "2.1", "A.", "I.")
             # since the algorithm assigns its own section numbers
-            display_text = re.sub(r"^\s*(?:\d+\.)+\s*|\s*^[IVXLCDMivxlcdm]+\.\s*|^\s*[A-Z]\.\s*", "", display_text).strip()
+            if '.' in display_text:  # every prefix form ends in '.'
+                display_text = SECTION_NUMBER_RE.sub("", display_text).strip()
             # Strip markdown formatting from TOC text (bold, italic, code, etc.)
             # Remove **bold**, __bold__, *italic*, _italic_
-            display_text = re.sub(r"\*\*([^*]+)\*\*", r"\1", display_text)  # **bold**
-            display_text = re.sub(r"__([^_]+)__", r"\1", display_text)      # __bold__
-            display_text = re.sub(r"\*([^*]+)\*", r"\1", display_text)      # *italic*
-            display_text = re.sub(r"_([^_]+)_", r"\1", display_text)        # _italic_
-            display_text = re.sub(r"`([^`]+)`", r"\1", display_text)        # `code`
-            display_text = re.sub(r"~~([^~]+)~~", r"\1", display_text)      # ~~strikethrough~~
+            for delimiter, pattern in INLINE_FORMAT_RES:
+                if delimiter in display_text:
+                    display_text = pattern.sub(r"\1", display_text)
             display_text = display_text.strip()
-            m_id = re.search(r"\{#([A-Za-z0-9_-]+)\}\s*$", lines[idx])
+            m_id = HEADING_ID_RE.search(lines[idx])
             anchor = m_id.group(1) if m_id else _slugify(display_text)
             nodes.append({
                 'level': level,
                 'text': display_text,
                 'anchor': anchor,
                 'children': [],
-                'number': ''  # Will be assigned during tree traversal
+                'number': ''  # Assigned when the node is placed in the tree
             })
         
         if not nodes:
             return []
         
-        # Build tree structure
-        root_level = min(node['level'] for node in nodes)
+        # Build tree structure, numbering nodes as they are placed (document order)
         tree = []
-        stack = []  # Stack of (node, level) to track hierarchy
+        stack = []  # Path from the top level down to the previous node
+        counters = {}  # Running section counter per heading level
         
         for node in nodes:
+            level = node['level']
             # Pop stack until we find the parent level
-            while stack and stack[-1]['level'] >= node['level']:
+            while stack and stack[-1]['level'] >= level:
                 stack.pop()
             
+            # A new section restarts the numbering of every deeper level
+            for l in counters:
+                if l > level:
+                    counters[l] = 0
+            counters[level] = counters.get(level, 0) + 1
+            
             if not stack:
                 # Top-level node
+                node['number'] = str(counters[level])
                 tree.append(node)
-                stack.append(node)
             else:
                 # Add as child to parent
                 parent = stack[-1]
+                node['number'] = f"{parent['number']}.{counters[level]}"
                 parent['children'].append(node)
-                stack.append(node)
+            stack.append(node)
         
         return tree
     
-    # Build tree and assign numbers
-    def assign_numbers(tree, parent_number='', counters=None):
-        """Recursively assign section numbers to tree nodes."""
-        if counters is None:
-            counters = {}
-        
-        for node in tree:
-            level = node['level']
-            
-            # Initialize counter for this level if needed
-            if level not in counters:
-                counters[level] = 0
-            
-            # Reset counters for deeper levels
-            deeper_levels = [l for l in counters.keys() if l > level]
-            for l in deeper_levels:
-                counters[l] = 0
-            
-            # Increment counter for current level
-            counters[level] += 1
-            
-            # Assign number
-            if parent_number:
-                node['number'] = f"{parent_number}.{counters[level]}"
-            else:
-                node['number'] = str(counters[level])
-            
-            # Recurse into children
-            if node['children']:
-                assign_numbers(node['children'], node['number'], counters)
-    
-    # Build tree and flatten for TOC rendering
     tree = build_hierarchy_tree(headings)
-    assign_numbers(tree)
-    
-    # Flatten tree to list for TOC rendering
-    def flatten_tree(tree):
-        """Convert tree structure back to flat list with all nodes."""
-        result = []
-        for node in tree:
-            result.append(node)
-        return result
-    
-    sections = flatten_tree(tree)
 
     # Build properly nested HTML structure from tree
-    def build_nested_toc_items(nodes, depth=0):
-        """Recursively build nested TOC HTML from tree structure."""
+    def write_nested_toc_items(nodes, rows, depth=0):
+        """Recursively append nested TOC HTML rows for the tree to rows."""
         if not nodes:
-            return []
+            return
         
-        result = []
-        result.append(f'<ol class="toc-ol toc-depth-{depth}">')
+        rows.append(f'<ol class="toc-ol toc-depth-{depth}">')
         
         for node in nodes:
-            has_children = len(node['children']) > 0
-            toggle = '<button class="toc-toggle" aria-expanded="true" title="Collapse section"></button>' if has_children else ''
+            has_children = bool(node['children'])
+            toggle = TOC_TOGGLE_HTML if has_children else ''
             
             # Determine item class based on depth
             item_class = f"toc-item toc-l{node['level']}" if depth > 0 else "toc-item toc-section"
             if has_children:
                 item_class += " toc-collapsible"
             
-            result.append(
+            rows.append(
                 f'<li class="{item_class}"><span class="toc-num">{node["number"]}</span>'
                 f'<span class="toc-main">{toggle}<a href="#{node["anchor"]}" class="toc-link">{node["text"]}</a></span>'
             )
             
             if has_children:
-                # Recursively build children
-                result.extend(build_nested_toc_items(node['children'], depth + 1))
+                # Children go straight into the same row list
+                write_nested_toc_items(node['children'], rows, depth + 1)
             
-            result.append('</li>')
+            rows.append('</li>')
         
-        result.append('</ol>')
-        return result
+        rows.append('</ol>')
     
     rows = []
     rows.append('<div class="generated-toc" role="navigation" aria-label="Table of contents">')
@@ -361,7 +422,7 @@ def build_toc(md: str) -> str:
     rows.append('<div class="toc-list">')
     
     # Build nested structure from tree
-    rows.extend(build_nested_toc_items(tree, depth=0))
+    write_nested_toc_items(tree, rows)
     
     rows.append('</div>')
     rows.append('</div>')
@@ -388,30 +449,32 @@ def build_toc(md: str) -> str:
 
 
 def annotate_blocks(md: str) -> str:
+    # Each detector stops scanning the block as soon as its answer is known
     def looks_like_program_code(text: str) -> bool:
-        tokens = [";", "=", "++", "--", "{", "}", "return ", "for ", "while ", "if ("]
-        return sum(text.count(t) for t in tokens) >= 3
+        score = 0
+        for t in PROGRAM_CODE_TOKENS:
+            score += text.count(t)
+            if score >= 3:
+                return True
+        return False
 
     def has_topology(text: str) -> bool:
-        return ("+---" in text or any(ch in text for ch in ["┌","─","┐","│","└","┘"])) and "->" not in text
+        return ("+---" in text or any(ch in text for ch in TOPOLOGY_CHARS)) and "->" not in text
 
     def has_sip(text: str) -> bool:
-        sip_methods = {"INVITE","ACK","BYE","CANCEL","REGISTER","OPTIONS","PRACK","SUBSCRIBE","NOTIFY","PUBLISH","INFO","REFER","MESSAGE","UPDATE"}
-        has_method = any(m in text for m in sip_methods)
-        has_code = re.search(r"^(1|2|3|4|5|6)\d\d\b", text, flags=re.MULTILINE) is not None
         arrows = text.count("->") + text.count("=>")
-        return arrows >= 2 and (has_method or has_code)
+        if arrows < 2:
+            return False
+        return any(m in text for m in SIP_METHOD_NAMES) or SIP_RESPONSE_LINE_RE.search(text) is not None
 
     def has_flowchart(text: str) -> bool:
-        arrows = re.findall(r"\b[A-Za-z0-9_.-]{2,}\s*->\s*[A-Za-z0-9_.-]{2,}\b", text)
-        return len(arrows) >= 2
+        edges = FLOW_EDGE_RE.finditer(text)
+        return next(edges, None) is not None and next(edges, None) is not None
 
-    fence = re.compile(r"```(?P<lang>[^\n]*)\n(?P<body>.*?)\n```", re.DOTALL)
     out = []
     last = 0
-    for m in fence.finditer(md):
-        out.append(md[last:m.start()])
-        body = m.group('body')
+    for start, end, _lang, body in iter_code_fences(md):
+        out.append(md[last:start])
 
         marker = None
         if looks_like_program_code(body):
@@ -426,8 +489,8 @@ def annotate_blocks(md: str) -> str:
             marker = "code-block"
 
         out.append(f"<!-- dv:block={marker} -->\n")
-        out.append(m.group(0))
-        last = m.end()
+        out.append(md[start:end])
+        last = end
 
     out.append(md[last:])
     return "".join(out)
@@ -0,0 +1,175 @@
+"""
+Trigram index for workspace full-text search.
+
+Every indexed document is reduced to the set of three-character substrings of its
+lowercased text, with a posting set of documents per trigram. A lowercase query
+can only occur in documents that contain all of its trigrams, so searches read
+just those candidates instead of every file in the workspace.
+
+An index can be persisted to SQLite (one row per document: path, mtime, size and
+its trigrams), so reopening a workspace only re-reads the documents that changed
+since it was last indexed.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple, Union
+
+# bytes.translate() table lowering ASCII letters (what str.lower() does on ASCII text)
+ASCII_LOWER = bytes.maketrans(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ', b'abcdefghijklmnopqrstuvwxyz')
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def fold_case(data: bytes) -> Union[bytes, str]:
+    """
+    A document's contents lowercased, as reading it in text mode (UTF-8, undecodable
+    bytes dropped, universal newlines) and calling lower() would give. ASCII
+    documents (most markdown) are lowered with ASCII_LOWER and returned as bytes
+    without decoding; others are returned as str.
+    """
+    if data.isascii():
+        if b'\r' in data:
+            data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        return data.translate(ASCII_LOWER)
+    text = data.decode('utf-8', errors='ignore')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text.lower()
+
+
+class TrigramIndex:
+    """
+    In-memory trigram index keyed by document path, optionally backed by a database
+    (see open()). sync() re-reads only documents whose size or mtime changed and
+    updates their postings in place; documents that disappear are dropped.
+    generation is bumped whenever a sync or open() changes the index.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.root: Optional[str] = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._signatures: Dict[str, Tuple[int, int]] = {}
+        self._grams: Dict[str, frozenset] = {}
+        self._postings: Dict[str, Set[str]] = {}
+
+    def open(self, root: str, db_path: str):
+        """
+        Replace the index with the one persisted for root at db_path (created if
+        missing); later syncs write their changes back to it. Rows for documents
+        outside root (a database built for another workspace) are dropped. If the
+        database can't be used the index starts empty and stays in memory.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self._signatures.clear()
+            self._grams.clear()
+            self._postings.clear()
+            self.root = root
+            self.generation += 1
+            try:
+                db = sqlite3.connect(db_path, check_same_thread=False)
+                db.execute('CREATE TABLE IF NOT EXISTS manifest '
+                           '(path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, grams TEXT)')
+                rows = db.execute('SELECT path, mtime_ns, size, grams FROM manifest').fetchall()
+                prefix = os.path.join(root, '')
+                foreign = [(row[0],) for row in rows if not row[0].startswith(prefix)]
+                if foreign:
+                    with db:
+                        db.executemany('DELETE FROM manifest WHERE path = ?', foreign)
+                    rows = [row for row in rows if row[0].startswith(prefix)]
+            except sqlite3.Error:
+                return
+            for path, mtime_ns, size, grams in rows:
+                # Trigrams are stored concatenated: every three characters is one
+                self._insert(path, (mtime_ns, size), frozenset(grams[i:i + 3] for i in range(0, len(grams), 3)))
+            self._db = db
+
+    def sync(self, paths: Iterable[str]) -> int:
+        """Bring the index in line with the given document paths; returns the generation."""
+        with self._lock:
+            updated = []
+            seen = set()
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                seen.add(path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if self._signatures.get(path) != signature:
+                    self._remove(path)
+                    self._add(path, signature)
+                    updated.append(path)
+            removed = [p for p in self._signatures if p not in seen]
+            for path in removed:
+                self._remove(path)
+            if updated or removed:
+                self.generation += 1
+                self._persist(updated, removed)
+            return self.generation
+
+    def candidates(self, query_lower: str) -> Optional[Set[str]]:
+        """
+        Paths of indexed documents that may contain query_lower, or None when the
+        query is too short to have trigrams (every document is then a candidate).
+        """
+        query_grams = trigrams(query_lower)
+        if not query_grams:
+            return None
+        with self._lock:
+            postings = [self._postings.get(gram, ()) for gram in query_grams]
+            postings.sort(key=len)
+            return set(postings[0]).intersection(*postings[1:])
+
+    def _add(self, path: str, signature: Tuple[int, int]):
+        try:
+            with open(path, 'rb') as f:
+                text = fold_case(f.read())
+        except OSError:
+            return
+        if isinstance(text, bytes):
+            text = text.decode('ascii')
+        grams = frozenset(trigrams(text))
+        self._insert(path, signature, grams)
+
+    def _insert(self, path: str, signature: Tuple[int, int], grams: frozenset):
+        self._signatures[path] = signature
+        self._grams[path] = grams
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                self._postings[gram] = {path}
+            else:
+                posting.add(path)
+
+    def _remove(self, path: str):
+        self._signatures.pop(path, None)
+        for gram in self._grams.pop(path, ()):
+            posting = self._postings[gram]
+            posting.discard(path)
+            if not posting:
+                del self._postings[gram]
+
+    def _persist(self, updated, removed):
+        if self._db is None:
+            return
+        try:
+            with self._db:
+                # Updated documents that couldn't be read are no longer indexed either
+                self._db.executemany('DELETE FROM manifest WHERE path = ?',
+                                     [(path,) for path in removed + updated if path not in self._signatures])
+                self._db.executemany('INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?)',
+                                     [(path, *self._signatures[path], ''.join(self._grams[path]))
+                                      for path in updated if path in self._signatures])
+        except sqlite3.Error:
+            # Keep serving from memory; the next open() re-reads what wasn't saved
+            self._db.close()
+            self._db = None
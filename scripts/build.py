@@ -166,7 +166,11 @@ def build():
         "pymdownx.tasklist", "pymdownx.arithmatex", "pymdownx.highlight",
         "pymdownx.inlinehilite", "pymdownx.keys", "pymdownx.smartsymbols",
         "pymdownx.snippets", "pymdownx.tilde", "pymdownx.caret",
-        "pymdownx.mark", "pymdownx.emoji", "pymdownx.saneheaders"
+        "pymdownx.mark", "pymdownx.emoji", "pymdownx.saneheaders",
+        # Imported lazily by docnexus.app (optional_import), so not visible to analysis
+        "pdfkit", "htmldocx", "mammoth", "bs4",
+        # Optional BeautifulSoup tree builder, selected at runtime when present
+        "lxml"
     ]
     for imp in hidden_imports:
         cmd.extend(["--hidden-import", imp])
@@ -0,0 +1,306 @@
+"""
+Tests for docnexus.app
+"""
+
+import json
+import os
+
+import pytest
+
+import docnexus.app as app_module
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """An empty workspace folder made active, with the search index kept under tmp_path."""
+    root = tmp_path / 'docs'
+    root.mkdir()
+    monkeypatch.setattr(app_module, 'MD_FOLDER', root)
+    monkeypatch.setattr(app_module, 'LOG_DIR', tmp_path)
+    app_module.invalidate_listing_cache()
+    return root
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def _search(client, **params):
+    response = client.get('/search', query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+# --- /search paging ---------------------------------------------------------
+
+def test_search_pages_continue_without_gaps(workspace, client):
+    for i in range(7):
+        (workspace / f'doc{i}.md').write_text(f'# Doc {i}\n\nthe needle is here\n')
+
+    pages = [_search(client, q='needle', limit=3, page=page) for page in (1, 2, 3)]
+    assert [page['count'] for page in pages] == [3, 3, 1]
+    assert [page['has_more'] for page in pages] == [True, True, False]
+    assert [page['page'] for page in pages] == [1, 2, 3]
+
+    paged = [result['path'] for page in pages for result in page['results']]
+    everything = [result['path'] for result in _search(client, q='needle')['results']]
+    assert paged == everything
+    assert sorted(paged) == [f'doc{i}.md' for i in range(7)]
+
+    past_the_end = _search(client, q='needle', limit=3, page=4)
+    assert past_the_end['results'] == []
+    assert past_the_end['has_more'] is False
+
+
+def test_search_exact_page_boundary_has_no_more(workspace, client):
+    for i in range(6):
+        (workspace / f'doc{i}.md').write_text('needle\n')
+
+    assert _search(client, q='needle', limit=3, page=2)['has_more'] is False
+    assert _search(client, q='needle', limit=3, page=1)['has_more'] is True
+
+
+def test_search_results_are_capped_at_max_results(workspace, client):
+    for i in range(app_module.MAX_RESULTS + 5):
+        (workspace / f'doc{i:03}.md').write_text('needle\n')
+
+    first = _search(client, q='needle')
+    assert first['count'] == app_module.MAX_RESULTS
+    assert first['limit'] == app_module.MAX_RESULTS
+    assert first['has_more'] is True
+
+    oversized = _search(client, q='needle', limit=1000)
+    assert oversized['limit'] == app_module.MAX_RESULTS
+    assert oversized['count'] == app_module.MAX_RESULTS
+
+    second = _search(client, q='needle', page=2)
+    assert second['count'] == 5
+    assert second['has_more'] is False
+
+
+@pytest.mark.parametrize('params, page, limit', [
+    ({'page': -3}, 1, app_module.MAX_RESULTS),
+    ({'page': 0}, 1, app_module.MAX_RESULTS),
+    ({'limit': 0}, 1, 1),
+    ({'limit': -5}, 1, 1),
+])
+def test_search_clamps_out_of_range_params(workspace, client, params, page, limit):
+    (workspace / 'doc.md').write_text('needle\n')
+
+    data = _search(client, q='needle', **params)
+    assert (data['page'], data['limit']) == (page, limit)
+    assert data['count'] == 1
+
+
+@pytest.mark.parametrize('params', [{'page': 'abc'}, {'limit': '2.5'}, {'page': ''}])
+def test_search_rejects_malformed_params(workspace, client, params):
+    response = client.get('/search', query_string={'q': 'needle', **params})
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+# --- /search ranking --------------------------------------------------------
+
+def test_multi_word_search_ranks_by_hits(workspace, client):
+    (workspace / 'alpha beta notes.md').write_text('nothing relevant\n')
+    (workspace / 'once.md').write_text('alpha appears once\n')
+    (workspace / 'often.md').write_text('alpha beta\n\nbeta and alpha again, beta\n')
+    (workspace / 'other.md').write_text('only beta here\n')
+    (workspace / 'unrelated.md').write_text('no matching words\n')
+
+    data = _search(client, q='Alpha Beta')
+    paths = [result['path'] for result in data['results']]
+    # Filename matches first, then content matches by descending hit count
+    assert paths[0] == 'alpha beta notes.md'
+    assert data['results'][0]['match_type'] == 'filename'
+    assert paths[1] == 'often.md'
+    assert data['results'][1]['score'] == 5
+    assert sorted(paths[2:]) == ['once.md', 'other.md']
+    assert all(result['score'] == 1 for result in data['results'][2:])
+
+    # Pages follow the ranked order
+    paged = [result['path'] for page in (1, 2) for result in
+             _search(client, q='alpha beta', limit=2, page=page)['results']]
+    assert paged == paths
+
+
+# --- listing caches ---------------------------------------------------------
+
+def _listed(**kwargs):
+    return {item['relative_path']: item for item in app_module.get_markdown_files(**kwargs)}
+
+
+def test_listing_reflects_a_save(workspace, client):
+    (workspace / 'doc.md').write_text('short\n')
+    assert _listed()['doc.md']['size'] == '6 B'
+    assert _listed(recursive=False)['doc.md']['size'] == '6 B'
+    epoch = app_module._LISTING_EPOCH
+
+    response = client.post('/api/save-document', json={'filename': 'doc.md', 'content': 'a longer body\n'})
+    assert response.status_code == 200
+
+    assert app_module._LISTING_EPOCH > epoch
+    assert _listed()['doc.md']['size'] == '14 B'
+    assert _listed(recursive=False)['doc.md']['size'] == '14 B'
+    assert (workspace / 'doc.md').read_text() == 'a longer body\n'
+
+
+def test_listing_follows_a_workspace_switch(workspace, tmp_path, client, monkeypatch):
+    other = tmp_path / 'other'
+    other.mkdir()
+    (workspace / 'first.md').write_text('needle\n')
+    (other / 'second.md').write_text('needle\n')
+    config_file = tmp_path / 'config.json'
+    config_file.write_text(json.dumps({'workspaces': [str(workspace), str(other.resolve())],
+                                       'active_workspace': str(workspace), 'recent_workspaces': []}))
+    monkeypatch.setattr(app_module, 'CONFIG_FILE', config_file)
+    monkeypatch.setattr(app_module, '_CONFIG_CACHE', (None, None))
+
+    assert list(_listed()) == ['first.md']
+    assert app_module.find_document(str(workspace), 'first') is not None
+    response = client.post('/api/workspaces/active', json={'path': str(other)})
+    assert response.status_code == 200
+
+    assert app_module.MD_FOLDER == other.resolve()
+    assert list(_listed()) == ['second.md']
+    assert list(_listed(recursive=False)) == ['second.md']
+    assert app_module.find_document(str(app_module.MD_FOLDER), 'first') is None
+    assert [result['path'] for result in _search(client, q='needle')['results']] == ['second.md']
+
+    # Reassigning MD_FOLDER directly (without the route) is picked up as well
+    monkeypatch.setattr(app_module, 'MD_FOLDER', workspace)
+    assert list(_listed()) == ['first.md']
+
+
+def test_listing_follows_nested_changes(workspace, client):
+    nested = workspace / 'guides' / 'deep'
+    nested.mkdir(parents=True)
+    (nested / 'one.md').write_text('one\n')
+    assert list(_listed()) == ['guides/deep/one.md']
+    assert _listed(recursive=False)['guides']['size'] == '1 items'
+    assert _listed(subdir='guides', recursive=False)['guides/deep']['size'] == '1 items'
+
+    # Added two levels down
+    (nested / 'two.md').write_text('two\n')
+    assert sorted(_listed()) == ['guides/deep/one.md', 'guides/deep/two.md']
+    assert _listed(subdir='guides', recursive=False)['guides/deep']['size'] == '2 items'
+    assert app_module.find_document(str(workspace), 'two') == str(nested / 'two.md')
+
+    # Rewritten in place: the directory mtime doesn't change, the file signature does
+    with open(nested / 'one.md', 'a') as f:
+        f.write('more text\n')
+    os.utime(nested / 'one.md', ns=(0, os.stat(nested / 'one.md').st_mtime_ns + 10**9))
+    assert _listed()['guides/deep/one.md']['size'] == '14 B'
+    assert _listed(subdir='guides/deep', recursive=False)['guides/deep/one.md']['size'] == '14 B'
+
+    # Removed
+    os.remove(nested / 'two.md')
+    assert list(_listed()) == ['guides/deep/one.md']
+    assert app_module.find_document(str(workspace), 'two') is None
+    assert [result['path'] for result in _search(client, q='more text')['results']] == ['guides/deep/one.md']
+
+
+# --- link rewriting ---------------------------------------------------------
+
+BROKEN = ' title="Link target not found" style="color: #dc2626; text-decoration: underline dotted;"'
+
+
+@pytest.fixture
+def linked_workspace(workspace):
+    (workspace / 'guide').mkdir()
+    (workspace / 'index.md').write_text('# Index\n')
+    (workspace / 'guide' / 'setup.md').write_text('# Setup\n')
+    return workspace
+
+
+def _rewrite(workspace, html, base='guide'):
+    return app_module.rewrite_links(html, workspace / base if base else workspace, workspace)
+
+
+@pytest.mark.parametrize('html, expected', [
+    ('<a href="setup.md">x</a>', '<a href="/file/guide/setup.md">x</a>'),
+    ("<a href='setup.md'>x</a>", '<a href="/file/guide/setup.md">x</a>'),
+    ('<a href=setup.md>x</a>', '<a href="/file/guide/setup.md">x</a>'),
+    ('<A HREF="../index.md">x</A>', '<a href="/file/index.md">x</A>'),
+    ('<a href="setup.md#install">x</a>', '<a href="/file/guide/setup.md#install">x</a>'),
+    ('<a href="../guide/./setup.md" download>x</a>', '<a href="/file/guide/setup.md" download>x</a>'),
+])
+def test_relative_links_point_to_file_view(linked_workspace, html, expected):
+    assert _rewrite(linked_workspace, html) == expected
+
+
+@pytest.mark.parametrize('html', [
+    '<a href="#install">x</a>',
+    '<a href="mailto:docs@example.com">x</a>',
+    '<a href="/file/index.md">x</a>',
+    '<a name="top">x</a>',
+    '<!-- <a href="setup.md"> -->',
+    '<script>var s = \'<a href="setup.md">\';</script>',
+])
+def test_links_left_as_is(linked_workspace, html):
+    assert _rewrite(linked_workspace, html) == html
+
+
+def test_external_links_open_in_new_tab(linked_workspace):
+    assert _rewrite(linked_workspace, '<a href="https://example.com/setup.md">x</a>') == \
+        '<a href="https://example.com/setup.md" target="_blank" rel="noopener noreferrer">x</a>'
+
+
+def test_missing_targets_keep_existing_classes(linked_workspace):
+    assert _rewrite(linked_workspace, '<a class="btn primary" href="missing.md">x</a>') == \
+        f'<a class="btn primary broken-link" href="missing.md"{BROKEN}>x</a>'
+    assert _rewrite(linked_workspace, '<a class=btn href="setup.md">x</a>') == \
+        '<a class="btn" href="/file/guide/setup.md">x</a>'
+
+
+def test_links_outside_the_workspace_are_broken(linked_workspace, tmp_path):
+    (tmp_path / 'outside.md').write_text('# Outside\n')
+    assert _rewrite(linked_workspace, '<a href="../outside.md">x</a>', base=None) == \
+        f'<a href="../outside.md" class="broken-link"{BROKEN}>x</a>'
+    assert _rewrite(linked_workspace, '<a href="../../outside.md">x</a>') == \
+        f'<a href="../../outside.md" class="broken-link"{BROKEN}>x</a>'
+    # Leaving and re-entering the workspace lexically still resolves inside it
+    assert _rewrite(linked_workspace, '<a href="../../docs/index.md">x</a>') == '<a href="/file/index.md">x</a>'
+
+
+def test_angle_bracket_in_attribute_value_falls_back_to_soup(linked_workspace):
+    bs4 = pytest.importorskip('bs4')
+    html = '<p><a title="1 > 0" href="setup.md">x</a> and <a href="missing.md">y</a></p>'
+    rewritten = _rewrite(linked_workspace, html)
+    assert rewritten.startswith('<p>') and rewritten.endswith('</p>')
+    # Attribute order depends on the parser
+    first, second = bs4.BeautifulSoup(rewritten, 'html.parser').find_all('a')
+    assert first.attrs == {'href': '/file/guide/setup.md', 'title': '1 > 0'}
+    assert second['href'] == 'missing.md'
+    assert second['class'] == ['broken-link']
+
+
+def test_parse_tag_attrs():
+    assert app_module.parse_tag_attrs(''' href='a.md' class="one  two" data-flag title=x&amp;y''') == \
+        {'href': 'a.md', 'class': ['one', 'two'], 'data-flag': None, 'title': 'x&y'}
+    # First occurrence of a repeated attribute wins, names are case-insensitive
+    assert app_module.parse_tag_attrs(' HREF="a.md" href="b.md"') == {'href': 'a.md'}
+    assert app_module.parse_tag_attrs(' href="a.md" /') == {'href': 'a.md'}
+    # Unbalanced quotes (e.g. a tag cut at a '>' inside a value) aren't guessed at
+    assert app_module.parse_tag_attrs(' title="1 ') is None
+    assert app_module.parse_tag_attrs(' href="a.md"x') is None
+
+
+def test_format_link_tag_escapes_values():
+    attrs = {'href': 'a"b&c.md', 'class': ['x', 'y'], 'download': None}
+    assert app_module.format_link_tag(attrs) == '<a href="a&quot;b&amp;c.md" class="x y" download>'
+    assert app_module.parse_tag_attrs(app_module.format_link_tag(attrs)[2:-1]) == attrs
+
+
+def test_rewrite_link_on_attribute_dicts(tmp_path):
+    (tmp_path / 'a.md').write_text('')
+    prefix = os.path.join(str(tmp_path), '')
+    attrs = {'href': 'a.md#top'}
+    assert app_module.rewrite_link(attrs, str(tmp_path), prefix) is True
+    assert attrs == {'href': '/file/a.md#top'}
+    attrs = {'href': '#top'}
+    assert app_module.rewrite_link(attrs, str(tmp_path), prefix) is False
+    # Relative links can't be resolved without a base directory
+    attrs = {'href': 'a.md'}
+    assert app_module.rewrite_link(attrs, None, prefix) is False
@@ -0,0 +1,46 @@
+"""
+Tests for docnexus.core.renderer
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from docnexus.core import renderer
+from docnexus.core.renderer import render_baseline
+
+
+def test_reused_instance_does_not_leak_between_documents():
+    """Markdown instances are reused; state from one document must not reach the next."""
+    html, _toc = render_baseline("# Intro\n\nHTML text[^1]\n\n[^1]: A note\n\n*[HTML]: Hyper Text Markup Language")
+    assert '<abbr title="Hyper Text Markup Language">HTML</abbr>' in html
+    assert 'class="footnote"' in html
+
+    html, toc = render_baseline("# Intro\n\nPlain HTML text")
+    assert html == '<h1 id="intro">Intro</h1>\n<p>Plain HTML text</p>'
+    assert 'href="#intro"' in toc
+
+
+def test_instances_are_pooled_across_threads():
+    """An instance returned by one thread is checked out again by the next one."""
+    renderer._MARKDOWN_POOL.clear()
+    outputs = []
+    for text in ("# One\n\n!!! note\n    Body", "# Two\n\n!!! note\n    Other"):
+        thread = threading.Thread(target=lambda text=text: outputs.append(render_baseline(text)))
+        thread.start()
+        thread.join()
+
+    assert [len(idle) for idle in renderer._MARKDOWN_POOL.values()] == [1]
+    assert 'class="admonition note"' in outputs[1][0]
+    assert '<h1 id="two">Two</h1>' in outputs[1][0]
+
+
+def test_concurrent_renders_use_separate_instances():
+    """Threads converting at the same time never share an instance."""
+    texts = [f"# Doc {i}\n\nText[^{i}]\n\n[^{i}]: Note {i}" for i in range(16)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(render_baseline, texts))
+
+    for i, (html, toc) in enumerate(results):
+        assert f'<h1 id="doc-{i}">Doc {i}</h1>' in html
+        assert f'Note {i}' in html
+        assert f'href="#doc-{i}"' in toc
@@ -0,0 +1,123 @@
+"""
+Tests for docnexus.search_index
+"""
+
+import os
+import sqlite3
+
+from docnexus.search_index import TrigramIndex, fold_case
+
+
+def _write(path, text, mtime_ns=None):
+    path.write_bytes(text.encode('utf-8'))
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+def test_short_queries_match_every_document(tmp_path):
+    """Queries without a trigram can't be filtered: candidates() returns None."""
+    index = TrigramIndex()
+    index.sync([_write(tmp_path / 'a.md', 'alpha')])
+
+    assert index.candidates('') is None
+    assert index.candidates('a') is None
+    assert index.candidates('al') is None
+    assert index.candidates('alp') == {str(tmp_path / 'a.md')}
+
+
+def test_candidates_are_case_folded(tmp_path):
+    """Documents are indexed lowercased, ASCII and non-ASCII alike."""
+    ascii_doc = _write(tmp_path / 'ascii.md', 'Setup GUIDE\r\nFor Windows')
+    accented = _write(tmp_path / 'accented.md', 'Crème BRÛLÉE au Café')
+    index = TrigramIndex()
+    index.sync([ascii_doc, accented])
+
+    assert index.candidates('setup guide') == {ascii_doc}
+    assert index.candidates('guide\nfor') == {ascii_doc}
+    assert index.candidates('brûlée') == {accented}
+    assert index.candidates('café') == {accented}
+    assert index.candidates('cafe') == set()
+    assert index.candidates('missing') == set()
+
+
+def test_fold_case_matches_text_mode_lower():
+    for data in (b'Mixed CASE\r\nLines\rhere', 'Ärger ÜBER Öl\r\n'.encode('utf-8')):
+        folded = fold_case(data)
+        if isinstance(folded, bytes):
+            folded = folded.decode('ascii')
+        expected = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n').lower()
+        assert folded == expected
+
+
+def test_sync_follows_edits_deletions_and_additions(tmp_path):
+    first = _write(tmp_path / 'first.md', 'original words')
+    second = _write(tmp_path / 'second.md', 'second document')
+    index = TrigramIndex()
+    generation = index.sync([first, second])
+    assert index.candidates('original') == {first}
+
+    # Unchanged documents leave the generation alone
+    assert index.sync([first, second]) == generation
+
+    _write(tmp_path / 'first.md', 'replaced content', mtime_ns=os.stat(first).st_mtime_ns + 10**9)
+    generation, previous = index.sync([first, second]), generation
+    assert generation > previous
+    assert index.candidates('original') == set()
+    assert index.candidates('replaced') == {first}
+
+    os.remove(second)
+    generation, previous = index.sync([first, second]), generation
+    assert generation > previous
+    assert index.candidates('second') == set()
+
+    third = _write(tmp_path / 'third.md', 'third document')
+    generation, previous = index.sync([first, third]), generation
+    assert generation > previous
+    assert index.candidates('document') == {third}
+
+
+def test_reopen_only_rereads_changed_documents(tmp_path):
+    root = tmp_path / 'docs'
+    root.mkdir()
+    db_path = str(tmp_path / 'index.db')
+    kept = _write(root / 'kept.md', 'kept text')
+    edited = _write(root / 'edited.md', 'before edit')
+
+    index = TrigramIndex()
+    index.open(str(root), db_path)
+    index.sync([kept, edited])
+
+    _write(root / 'edited.md', 'after edit', mtime_ns=os.stat(edited).st_mtime_ns + 10**9)
+    reopened = TrigramIndex()
+    reopened.open(str(root), db_path)
+    # Loaded from the database before any sync
+    assert reopened.candidates('before') == {edited}
+    reopened.sync([kept, edited])
+    assert reopened.candidates('before') == set()
+    assert reopened.candidates('after') == {edited}
+    assert reopened.candidates('kept') == {kept}
+
+
+def test_reopen_drops_rows_from_another_workspace(tmp_path):
+    """A database built for one root doesn't leak documents into another."""
+    db_path = str(tmp_path / 'index.db')
+    old_root = tmp_path / 'old'
+    new_root = tmp_path / 'new'
+    old_root.mkdir()
+    new_root.mkdir()
+    old_doc = _write(old_root / 'a.md', 'shared phrase')
+    new_doc = _write(new_root / 'b.md', 'shared phrase')
+
+    index = TrigramIndex()
+    index.open(str(old_root), db_path)
+    index.sync([old_doc])
+
+    index.open(str(new_root), db_path)
+    assert index.root == str(new_root)
+    assert index.candidates('shared') == set()
+    index.sync([new_doc])
+    assert index.candidates('shared') == {new_doc}
+
+    with sqlite3.connect(db_path) as db:
+        assert [row[0] for row in db.execute('SELECT path FROM manifest')] == [new_doc]